@@ -1,10 +1,23 @@
-﻿import streamlit as st
-import pandas as pd
+﻿import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import streamlit as st
 from streamlit_folium import st_folium
-from modules.zagrozenie import AsteroidDatabase
+from modules.zagrozenie import AsteroidDatabase, SHOCKWAVE_DURATION_MIN, calculate_shockwave_radius
 from modules.map_renderer import render_map
+from modules.orbit_propagation import load_orbital_elements
+from modules.pipeline import DataflowGraph
 from modules.ai_planner import ai_select_evacuation
-from modules.utils import ORS_API_KEY
+from modules.background import result_if_done, submit_latest
+from modules.coverage import CoverageAnalysis
+from modules.decision_tiles import DecisionTileCache, DecisionTileTable
+from modules.impact_uncertainty import impact_exceedance_grid
+from modules.poi_tiles import circle_bbox, load_poi_layers
+from modules.route_cache import RouteCache
+from modules.scenario_pack import ScenarioPack
+from modules.threat_feed import DirectoryFeed, HttpFeed, ThreatFeedWatcher
+from modules.utils import (ORS_API_KEY, ORS_MAX_CONCURRENT, ORS_MIN_INTERVAL_S, THREAT_FEED_URL, THREAT_FEED_DIR,
+                           SCENARIO_PACK, POI_TILES_DIR, ORBITS_FILE)
 
 st.set_page_config(
     page_title="Impact Zone",
@@ -12,12 +25,137 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-shelters_df = pd.read_csv("data/shelters.csv")
-aed_df = pd.read_csv("data/aed.csv")
-water_points_df = pd.read_csv("data/water_points.csv")
-medical_points_df = pd.read_csv("data/medical_points.csv")
+CLOSE_APPROACH_WINDOW_DAYS = 100 * 365  # okno wyszukiwania najbliższego zbliżenia od dziś
 
-db = AsteroidDatabase()
+@st.cache_resource
+def get_database():
+    """Wspólna baza asteroid dla wszystkich sesji, odświeżana w tle przez feed zagrożeń"""
+    database = AsteroidDatabase()
+
+    orbits = load_orbital_elements(ORBITS_FILE) if ORBITS_FILE and os.path.exists(ORBITS_FILE) else {}
+    propagated = set()
+
+    def refresh_close_approaches(names):
+        """Data i odległość zbliżenia z propagacji orbit (dla asteroid, które mają elementy, raz na asteroidę)"""
+        selected = {name: orbits[name] for name in names if name in orbits and name not in propagated}
+        if selected:
+            propagated.update(selected)
+            start = date.today()
+            database.update_close_approaches(
+                selected, start.isoformat(), (start + timedelta(days=CLOSE_APPROACH_WINDOW_DAYS)).isoformat()
+            )
+
+    refresh_close_approaches(orbits)
+
+    if THREAT_FEED_URL:
+        feed = HttpFeed(THREAT_FEED_URL)
+    elif THREAT_FEED_DIR:
+        feed = DirectoryFeed(THREAT_FEED_DIR)
+    else:
+        return database
+
+    watcher = ThreatFeedWatcher(database, feed)
+    # Asteroidy dodane przez feed też dostają zbliżenia z orbit; dla już przeliczonych
+    # upsert_asteroids zachowuje pola z propagacji
+    watcher.subscribe(refresh_close_approaches)
+    watcher.start_in_thread()
+    return database
+
+db = get_database()
+
+FEED_REFRESH_S = 10  # jak często otwarte sesje sprawdzają zmiany z feedu zagrożeń
+
+POI_MARGIN_KM = 20  # schrony tuż za zasięgiem fali też są potrzebne do ewakuacji
+
+USER_POI_RADIUS_KM = 10  # okolica użytkownika - jego najbliższe schrony muszą się wczytać także daleko od uderzenia
+
+def poi_bbox(impact_lat, impact_lon, max_radius_km, user_lat=None, user_lon=None):
+    """Prostokąt POI: zasięg fali z marginesem, powiększony o okolicę użytkownika (jeśli podana)"""
+    bbox = circle_bbox(impact_lat, impact_lon, max_radius_km + POI_MARGIN_KM)
+    if user_lat is not None:
+        user_bbox = circle_bbox(user_lat, user_lon, USER_POI_RADIUS_KM)
+        bbox = (
+            min(bbox[0], user_bbox[0]),
+            min(bbox[1], user_bbox[1]),
+            max(bbox[2], user_bbox[2]),
+            max(bbox[3], user_bbox[3])
+        )
+    return tuple(round(v, 4) for v in bbox)
+
+@st.cache_data(max_entries=32)
+def get_poi_layers(bbox):
+    """POI z prostokąta (min_lat, min_lng, max_lat, max_lng) - z kafli tylko te, które go przecinają"""
+    return load_poi_layers(bbox, POI_TILES_DIR)
+
+@st.cache_resource(max_entries=16)
+def get_coverage(_poi_layers, asteroid_name, impact_lat, impact_lon, max_radius_km):
+    """Analiza dostępności zasobów dla scenariusza - aktualizowana przyrostowo suwakiem czasu"""
+    return CoverageAnalysis(
+        _poi_layers["shelters"],
+        {name: _poi_layers[name] for name in ("aed", "water_points", "medical_points")},
+        impact_lat,
+        impact_lon
+    )
+
+@st.cache_resource
+def get_routing_executor():
+    """Wspólna pula wątków do routingu - wywołania ORS nie blokują renderowania strony"""
+    return ThreadPoolExecutor(max_workers=8)
+
+@st.cache_resource
+def get_scenario_pack():
+    """Paczka prekomputowanych scenariuszy (jeśli jest) - tryb bez sieci"""
+    if SCENARIO_PACK and os.path.exists(SCENARIO_PACK):
+        return ScenarioPack(SCENARIO_PACK)
+    return None
+
+scenario_pack = get_scenario_pack()
+
+TILE_TIME_STEP_MIN = 5  # tablice decyzji liczone są dla zgrubnych kroków czasu, nie dla każdej minuty suwaka
+
+@st.cache_resource
+def get_route_cache():
+    """
+    Wspólna pamięć tras ORS dla wszystkich tablic decyzji: trasa komórka -> schron
+    nie zależy od asteroidy ani kroku czasu. Ogranicza też równoległe wywołania ORS.
+    """
+    return RouteCache(max_concurrent=ORS_MAX_CONCURRENT, min_interval_s=ORS_MIN_INTERVAL_S)
+
+@st.cache_resource
+def get_tile_cache():
+    """Wspólne dla sesji tablice decyzji; usunięcie tablicy z cache przerywa jej prekomputację"""
+    return DecisionTileCache(max_entries=8)
+
+def get_decision_tiles(shelters_df, asteroid_name, impact_lat, impact_lon, time_to_impact_min, max_radius_km):
+    """
+    Tablica decyzji ewakuacyjnych dla scenariusza - liczona raz, w tle, współdzielona przez sesje.
+    Czas zaokrąglany jest w dół do TILE_TIME_STEP_MIN: mniej czasu i większa fala dają decyzję zachowawczą.
+    """
+    tile_time = TILE_TIME_STEP_MIN * (time_to_impact_min // TILE_TIME_STEP_MIN)
+    key = (asteroid_name, round(impact_lat, 4), round(impact_lon, 4), tile_time, round(max_radius_km, 2), len(shelters_df))
+    return get_tile_cache().get(key, lambda: DecisionTileTable(
+        shelters_df,
+        impact_lat,
+        impact_lon,
+        calculate_shockwave_radius(max_radius_km, tile_time),
+        tile_time,
+        route_fn=get_route_cache(),
+        shockwave_speed_km_min=max_radius_km / SHOCKWAVE_DURATION_MIN,
+        max_radius_km=max_radius_km
+    ))
+
+@st.cache_data(max_entries=16)
+def get_probability_grid(asteroid_name, impact_lat, impact_lon, sigma_east_km, sigma_north_km, correlation, db_revision):
+    """
+    Mapa prawdopodobieństwa zniszczeń dla niepewnego punktu uderzenia (Monte Carlo).
+    db_revision w kluczu cache - zmiana bazy przez feed zagrożeń unieważnia wynik.
+    """
+    asteroid = next(a for a in db.asteroids if a.name == asteroid_name)
+    cov_km = [
+        [sigma_east_km ** 2, correlation * sigma_east_km * sigma_north_km],
+        [correlation * sigma_east_km * sigma_north_km, sigma_north_km ** 2]
+    ]
+    return impact_exceedance_grid(asteroid, impact_lat, impact_lon, cov_km)
 
 st.sidebar.header("⚠️ Impact simulation")
 asteroid_names = [a.name for a in db.asteroids]
@@ -50,62 +188,234 @@ st.sidebar.header("🌋 Impact location")
 impact_lat = st.sidebar.number_input("Impact latitude", value=52.2550)
 impact_lon = st.sidebar.number_input("Impact longitude", value=21.0400)
 
+st.sidebar.header("🎲 Impact uncertainty")
+uncertainty_mode = st.sidebar.checkbox("Uncertain impact point (heatmap)", value=False)
+if uncertainty_mode:
+    sigma_east_km = st.sidebar.slider("σ east-west (km)", 0.5, 50.0, 5.0)
+    sigma_north_km = st.sidebar.slider("σ north-south (km)", 0.5, 50.0, 5.0)
+    correlation = st.sidebar.slider("Correlation", -0.9, 0.9, 0.0)
+
 time_to_impact_min = st.sidebar.slider("⏱️ Minutes to impact", 0, 60, 15)
 time_after_impact_min = st.sidebar.slider("🌪️ Minutes after impact", 0, 300, 0)
 
-selected_asteroid = next(a for a in db.asteroids if a.name == selected_asteroid_name)
-impact_details = db.calculate_impact_for_location(selected_asteroid, impact_lat, impact_lon)
+def build_scenario_pipeline():
+    """
+    Potok scenariusza jako graf zależności: dane -> szczegóły uderzenia -> promień fali
+    -> klasyfikacja POI -> ewakuacja -> mapa. Każdy węzeł jest przeliczany tylko wtedy,
+    gdy zmieniły się jego (kwantyzowane) wejścia albo wyniki węzłów, od których zależy.
+    """
+    graph = DataflowGraph()
+    impact_quantize = {"impact_lat": 1e-4, "impact_lon": 1e-4}
 
-max_radius = impact_details["destruction_zones"]["shockwave_radius_km"]
-shockwave_speed = max_radius / 300
+    @graph.node(inputs=("asteroid_name", "impact_lat", "impact_lon", "db_revision"), quantize=impact_quantize)
+    def impact_details(asteroid_name, impact_lat, impact_lon, db_revision):
+        pack_scenario = scenario_pack.scenario(asteroid_name, impact_lat, impact_lon) if scenario_pack else None
+        if pack_scenario:
+            return pack_scenario["impact_details"]
+        asteroid = next(a for a in db.asteroids if a.name == asteroid_name)
+        return db.calculate_impact_for_location(asteroid, impact_lat, impact_lon)
 
-if time_to_impact_min > 0:
-    current_radius = min(max_radius, shockwave_speed * (60 - time_to_impact_min))
-else:
-    current_radius = min(max_radius, shockwave_speed * time_after_impact_min)
-
-asteroid_data = {
-    "asteroid_name": impact_details["asteroid_name"],
-    "impact_coordinates": {"lat": impact_lat, "lon": impact_lon},
-    "circles_coordinates": impact_details.get("circles_coordinates", {}),
-    "destruction_zones": impact_details.get("destruction_zones", {}),
-    "threat_level": impact_details.get("threat_level", "unknown"),
-    "energy_megatons": impact_details.get("energy_megatons", 0),
-    "historical_comparison": impact_details.get("historical_comparison", ""),
-    "total_affected_area_km2": impact_details.get("total_affected_area_km2", 0),
-    "trajectory": impact_details.get("trajectory", ""),
-    "impact_probability": impact_details.get("impact_probability", 0.0),
-    "shockwave_radius_km": current_radius
-}
-
-ai_decision = ai_select_evacuation(
-    st.session_state.user_location,
-    shelters_df,
+    @graph.node(deps=("impact_details",), inputs=("impact_lat", "impact_lon"), quantize=impact_quantize)
+    def poi_layers(impact_details, impact_lat, impact_lon):
+        """POI strefy zagrożenia - do analizy zasobów i tablic decyzji (wspólne dla wszystkich użytkowników)"""
+        return get_poi_layers(poi_bbox(impact_lat, impact_lon, impact_details["destruction_zones"]["shockwave_radius_km"]))
+
+    @graph.node(deps=("impact_details",), inputs=("impact_lat", "impact_lon", "user_lat", "user_lng"),
+                quantize={**impact_quantize, "user_lat": 0.01, "user_lng": 0.01})
+    def local_poi_layers(impact_details, impact_lat, impact_lon, user_lat, user_lng):
+        """POI strefy zagrożenia i okolicy użytkownika - do mapy i routingu na żywo"""
+        max_radius = impact_details["destruction_zones"]["shockwave_radius_km"]
+        return get_poi_layers(poi_bbox(impact_lat, impact_lon, max_radius, user_lat, user_lng))
+
+    @graph.node(deps=("impact_details",), inputs=("time_to_impact_min", "time_after_impact_min"), cutoff=True)
+    def shockwave(impact_details, time_to_impact_min, time_after_impact_min):
+        zones = impact_details["destruction_zones"]
+        max_radius = zones["shockwave_radius_km"]
+        current_radius = calculate_shockwave_radius(max_radius, time_to_impact_min, time_after_impact_min)
+        return {
+            "max_radius": max_radius,
+            "speed": max_radius / SHOCKWAVE_DURATION_MIN,
+            "current_radius": current_radius,
+            # Zniszczone są punkty w strefie poważnych zniszczeń, do której dotarła już fala
+            "destroyed_radius": 0.0 if time_to_impact_min > 0 else min(current_radius, zones.get("severe_damage_km", 0))
+        }
+
+    @graph.node(deps=("impact_details", "shockwave"), inputs=("impact_lat", "impact_lon"), quantize=impact_quantize)
+    def asteroid_data(impact_details, shockwave, impact_lat, impact_lon):
+        return {
+            "asteroid_name": impact_details["asteroid_name"],
+            "impact_coordinates": {"lat": impact_lat, "lon": impact_lon},
+            "circles_coordinates": impact_details.get("circles_coordinates", {}),
+            "destruction_zones": impact_details.get("destruction_zones", {}),
+            "threat_level": impact_details.get("threat_level", "unknown"),
+            "energy_megatons": impact_details.get("energy_megatons", 0),
+            "historical_comparison": impact_details.get("historical_comparison", ""),
+            "total_affected_area_km2": impact_details.get("total_affected_area_km2", 0),
+            "trajectory": impact_details.get("trajectory", ""),
+            "impact_probability": impact_details.get("impact_probability", 0.0),
+            "shockwave_radius_km": shockwave["current_radius"]
+        }
+
+    @graph.node(deps=("poi_layers", "shockwave"), inputs=("asteroid_name", "impact_lat", "impact_lon"), quantize=impact_quantize)
+    def poi_classification(poi_layers, shockwave, asteroid_name, impact_lat, impact_lon):
+        coverage = get_coverage(poi_layers, asteroid_name, impact_lat, impact_lon, shockwave["max_radius"])
+        return coverage.at(shockwave["destroyed_radius"])
+
+    @graph.node(deps=("shockwave",), cutoff=True)
+    def routing_params(shockwave):
+        # Tylko to, od czego zależy wybór schronu - gdy fala osiągnie maksymalny
+        # zasięg, dalszy ruch suwakiem "po uderzeniu" nie przelicza tras
+        return {
+            "current_radius": shockwave["current_radius"],
+            "speed": shockwave["speed"],
+            "max_radius": shockwave["max_radius"]
+        }
+
+    @graph.node(deps=("local_poi_layers", "routing_params"),
+                inputs=("impact_lat", "impact_lon", "time_to_impact_min", "user_lat", "user_lng", "tile_decision"),
+                quantize={**impact_quantize, "user_lat": 1e-4, "user_lng": 1e-4})
+    def evacuation(local_poi_layers, routing_params, impact_lat, impact_lon, time_to_impact_min, user_lat, user_lng,
+                   tile_decision):
+        """
+        Szybka ścieżka (paczka / tablica decyzji) i argumenty routingu w tle, gdy jej brak.
+        tile_decision jest wejściem, a nie odczytem w węźle - brak gotowej komórki nie zostaje
+        zapamiętany, a jej policzenie w tle przełącza sesję na decyzję z tablicy.
+        """
+        if tile_decision:
+            return {"decision": tile_decision, "request": None}
+
+        shelters_df = local_poi_layers["shelters"]
+        current_radius = routing_params["current_radius"]
+
+        request = dict(
+            user_location={"lat": user_lat, "lng": user_lng},
+            shelters_df=shelters_df,
+            impact_lat=impact_lat,
+            impact_lng=impact_lon,
+            shockwave_radius_km=current_radius,
+            time_to_impact_min=time_to_impact_min,
+            ors_api_key=ORS_API_KEY,
+            shockwave_speed_km_min=routing_params["speed"],
+            max_radius_km=routing_params["max_radius"]
+        )
+        return {"decision": None, "request": request}
+
+    @graph.node(inputs=("asteroid_name", "impact_lat", "impact_lon", "db_revision", "uncertainty"), quantize=impact_quantize)
+    def probability_grid(asteroid_name, impact_lat, impact_lon, db_revision, uncertainty):
+        if uncertainty is None:
+            return None
+        return get_probability_grid(asteroid_name, impact_lat, impact_lon, *uncertainty, db_revision)
+
+    @graph.node(deps=("asteroid_data", "local_poi_layers", "probability_grid"),
+                inputs=("user_lat", "user_lng", "evacuation_routes"))
+    def map_object(asteroid_data, local_poi_layers, probability_grid, user_lat, user_lng, evacuation_routes):
+        return render_map(
+            asteroid_data,
+            local_poi_layers["shelters"],
+            local_poi_layers["aed"],
+            local_poi_layers["medical_points"],
+            local_poi_layers["water_points"],
+            {"lat": user_lat, "lng": user_lng},
+            [list(route) for route in evacuation_routes],
+            probability_grid
+        )
+
+    return graph
+
+if "pipeline" not in st.session_state:
+    st.session_state.pipeline = build_scenario_pipeline()
+pipeline = st.session_state.pipeline
+
+pipeline.set_inputs(
+    asteroid_name=selected_asteroid_name,
+    impact_lat=impact_lat,
+    impact_lon=impact_lon,
+    db_revision=db.revision,
+    time_to_impact_min=time_to_impact_min,
+    time_after_impact_min=time_after_impact_min,
+    user_lat=st.session_state.user_location["lat"],
+    user_lng=st.session_state.user_location["lng"],
+    uncertainty=(sigma_east_km, sigma_north_km, correlation) if uncertainty_mode else None
+)
+
+if THREAT_FEED_URL or THREAT_FEED_DIR:
+    @st.fragment(run_every=FEED_REFRESH_S)
+    def follow_threat_feed(revision):
+        """Przeładowuje otwartą stronę, gdy feed zagrożeń zmienił bazę od ostatniego renderowania"""
+        if db.revision != revision:
+            st.rerun(scope="app")
+
+    follow_threat_feed(db.revision)
+
+def fast_decision(asteroid_name, impact_lat, impact_lon, time_to_impact_min, user_lat, user_lng):
+    """Decyzja z paczki scenariuszy albo z tablicy decyzji - None, gdy komórka nie jest (jeszcze) policzona"""
+    pack_scenario = scenario_pack.scenario(asteroid_name, impact_lat, impact_lon) if scenario_pack else None
+    if pack_scenario:
+        # Scenariusz z paczki - tablica decyzji oparta na ORS nie jest uruchamiana
+        return scenario_pack.decide(pack_scenario, time_to_impact_min, user_lat, user_lng)
+    return get_decision_tiles(
+        pipeline.get("poi_layers")["shelters"],
+        asteroid_name,
+        impact_lat,
+        impact_lon,
+        time_to_impact_min,
+        pipeline.get("routing_params")["max_radius"]
+    ).lookup(user_lat, user_lng)
+
+# Odczyt tablicy przy każdym przebiegu (poza cache grafu) - O(1)
+pipeline.update_inputs(tile_decision=fast_decision(
+    selected_asteroid_name,
     impact_lat,
     impact_lon,
-    current_radius,
     time_to_impact_min,
-    ors_api_key=ORS_API_KEY
-)
+    st.session_state.user_location["lat"],
+    st.session_state.user_location["lng"]
+))
+
+asteroid_data = pipeline.get("asteroid_data")
+current_radius = pipeline.get("shockwave")["current_radius"]
+evacuation = pipeline.get("evacuation")
+ai_decision = evacuation["decision"]
+
+# Brak gotowej decyzji - routing ORS leci w tle, a strona renderuje się od razu
+# ze strefami i szczegółami; trasa pojawi się po zakończeniu zadania
+routing_pending = False
+if ai_decision is None:
+    routing_slot = st.session_state.setdefault("routing_job", {})
+    routing_job = submit_latest(
+        routing_slot,
+        pipeline.version("evacuation"),
+        get_routing_executor(),
+        ai_select_evacuation,
+        **evacuation["request"]
+    )
+    routing_pending = not routing_job.done()
+    ai_decision = result_if_done(routing_job)
 
 if ai_decision:
     evacuation_routes = [ai_decision["route"]]
     st.sidebar.success(f"🧠 AI chose: {ai_decision['name']} ({ai_decision['mode']}, {int(ai_decision['duration'])} min)")
+elif routing_pending:
+    evacuation_routes = []
+    st.sidebar.info("🧭 Computing evacuation route...")
 else:
     evacuation_routes = []
     st.sidebar.error("❌ No safe route found in time!")
 
+if routing_pending:
+    @st.fragment(run_every=1.0)
+    def wait_for_route(job):
+        """Sprawdza co sekundę zadanie routingu i przeładowuje stronę, gdy jest gotowe"""
+        if job.done():
+            st.rerun(scope="app")
+        st.caption("🧭 Route to shelter is being computed - the map will update automatically.")
+
+    wait_for_route(routing_job)
+
+pipeline.update_inputs(evacuation_routes=evacuation_routes)
+
 st.markdown("### 🗺️ Threat Map")
-map_object = render_map(
-    asteroid_data,
-    shelters_df,
-    aed_df,
-    medical_points_df,
-    water_points_df,
-    st.session_state.user_location,
-    evacuation_routes
-)
-st_folium(map_object, use_container_width=True, height=500)
+st_folium(pipeline.get("map_object"), use_container_width=True, height=500)
 
 st.markdown("### 💥 Asteroid details")
 st.write(f"**Threat level:** {asteroid_data['threat_level']}")
@@ -120,6 +430,8 @@ with st.expander("📋 Evacuation details"):
     if ai_decision:
         st.subheader(f"🏠 {ai_decision['name']}")
         st.write(f"➡️ {ai_decision['mode']}: {int(ai_decision['duration'])} min ({ai_decision['distance']:.2f} km)")
+    elif routing_pending:
+        st.info("Evacuation route is still being computed.")
     else:
         st.warning("No escape route available.")
 
@@ -129,6 +441,13 @@ else:
     st.error(f"💥 Impact occurred {time_after_impact_min} minutes ago.")
 
 st.markdown("### 🧭 Instructions after impact")
+
+with st.expander("🏥 Resources reachable from shelters"):
+    st.dataframe(pipeline.get("poi_classification"), hide_index=True)
+
+with st.sidebar.expander("⚙️ Pipeline stats"):
+    st.dataframe(pipeline.stats(), hide_index=True)
+
 etap = st.selectbox("Select stage", ["⏱️ First hours", "📆 First days", "🗓️ First weeks"])
 
 if etap == "⏱️ First hours":
@@ -0,0 +1,244 @@
+"""
+Test obciążeniowy aplikacji bez przeglądarki.
+
+Każdy symulowany użytkownik to osobna sesja app.py uruchamiana przez
+streamlit.testing (ten sam kod co na serwerze: graf potoku, tablice decyzji,
+paczka scenariuszy, routing w tle): otwarcie strony, ustawienie lokalizacji,
+asteroidy i czasu, a potem przeładowania do chwili, gdy trasa jest gotowa
+(jak fragment wait_for_route). Zamiast OpenRouteService używany jest lokalny
+zamiennik z konfigurowalnym opóźnieniem i odsetkiem błędów.
+
+Czasy mierzone są bez profilera pamięci; pamięć to przyrost RSS procesu
+(psutil, próbkowany w tle), więc wyniki nadają się do wymiarowania.
+
+Uruchomienie:
+    python load_test.py --users 1,10,50 --requests 20 --latency-ms 300 --error-rate 0.05
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import psutil
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.testing.v1 import AppTest
+
+os.environ.setdefault("ORS_API_KEY", "load-test")
+
+from modules import utils
+from modules.evacuation_planner import haversine
+from modules.zagrozenie import AsteroidDatabase
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+ROUTE_POLL_S = 0.25  # odstęp przeładowań w oczekiwaniu na trasę (w aplikacji fragment co 1 s)
+
+_SHARED_SCRIPT_CACHE = ScriptCache()
+_get_bytecode = ScriptCache.get_bytecode
+_apptest_lock = threading.Lock()
+
+def share_script_cache():
+    """
+    Jeden skompilowany app.py dla wszystkich sesji - jak na serwerze Streamlit.
+    AppTest tworzy ScriptCache na instancję, a równoległe kompilacje w wątkach
+    dają w Pythonie 3.11 fałszywe "SystemError: AST constructor recursion depth
+    mismatch", które test liczyłby jako błędy aplikacji.
+    """
+    ScriptCache.get_bytecode = lambda self, script_path: _get_bytecode(_SHARED_SCRIPT_CACHE, script_path)
+
+PROFILE_SPEED_KMH = {
+    "foot-walking": 5,
+    "cycling-regular": 15,
+    "driving-car": 40
+}
+
+class StubORSClient:
+    """Lokalny zamiennik openrouteservice.Client (tylko directions w formacie geojson)"""
+
+    def __init__(self, latency_ms=300.0, error_rate=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def directions(self, coordinates, profile, format="geojson"):
+        with self._lock:
+            # Rozkład log-normalny - długi ogon jak w prawdziwym API
+            delay = self._rng.lognormvariate(0, 0.5) * self.latency_ms / 1000
+            failed = self._rng.random() < self.error_rate
+        time.sleep(delay)
+        if failed:
+            raise RuntimeError("stub ORS: simulated error")
+
+        (lon1, lat1), (lon2, lat2) = coordinates
+        distance_km = haversine((lat1, lon1), (lat2, lon2)) * 1.3  # drogi nie są w linii prostej
+        points = np.linspace([lon1, lat1], [lon2, lat2], 50).tolist()
+        return {
+            "features": [{
+                "properties": {"summary": {
+                    "distance": distance_km * 1000,
+                    "duration": distance_km / PROFILE_SPEED_KMH[profile] * 3600
+                }},
+                "geometry": {"coordinates": points}
+            }]
+        }
+
+def _sidebar_texts(at):
+    return [e.value for e in at.sidebar.success], [e.value for e in at.sidebar.info], [e.value for e in at.sidebar.error]
+
+def simulate_session(user_location, impact, asteroid_name, time_to_impact_min, timeout_s=60.0):
+    """
+    Jedna sesja użytkownika na prawdziwym app.py.
+
+    Returns:
+        (czasy renderowania stron w s, czas do gotowej trasy w s)
+    """
+    with _apptest_lock:
+        at = AppTest.from_file(APP_PATH, default_timeout=timeout_s)
+    render_times = []
+
+    def run():
+        start = time.perf_counter()
+        at.run()
+        render_times.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+
+    run()  # otwarcie strony z wartościami domyślnymi
+
+    started = time.perf_counter()
+    at.sidebar.selectbox[0].set_value(asteroid_name)
+    at.sidebar.number_input(key="lat_input").set_value(user_location["lat"])
+    at.sidebar.number_input(key="lon_input").set_value(user_location["lng"])
+    for label, value in zip(("Impact latitude", "Impact longitude"), impact):
+        next(n for n in at.sidebar.number_input if n.label == label).set_value(value)
+    next(s for s in at.sidebar.slider if s.label.startswith("⏱️")).set_value(time_to_impact_min)
+    run()
+
+    # Trasa liczona w tle - przeładowujemy, aż zniknie komunikat "Computing..."
+    while _sidebar_texts(at)[1]:
+        if time.perf_counter() - started > timeout_s:
+            raise TimeoutError("route not ready")
+        time.sleep(ROUTE_POLL_S)
+        run()
+
+    return render_times, time.perf_counter() - started
+
+class RssSampler:
+    """Maksymalny RSS procesu w czasie etapu (próbkowanie w wątku w tle)"""
+
+    def __init__(self, interval_s=0.05):
+        self.interval_s = interval_s
+        self.process = psutil.Process()
+        self.baseline = self.peak = self.process.memory_info().rss
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval_s):
+            self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stopped.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+def random_users(n, seed=None):
+    """Lokalizacje użytkowników: okolice schronów (tam mieszkają ludzie) z rozrzutem ~2 km"""
+    rng = np.random.default_rng(seed)
+    shelters = pd.read_csv("data/shelters.csv")[["lat", "lng"]].to_numpy()
+    base = shelters[rng.integers(0, len(shelters), n)]
+    points = base + rng.normal(0, 0.02, size=(n, 2))
+    return [{"lat": float(lat), "lng": float(lng)} for lat, lng in points]
+
+def run_stage(users, requests_per_user, args):
+    """Jeden poziom współbieżności; zwraca statystyki"""
+    locations = random_users(users, args.seed)
+    asteroid_names = [a.name for a in AsteroidDatabase().asteroids]
+    render_times = []
+    route_times = []
+    errors = []
+    lock = threading.Lock()
+
+    def user_session(i):
+        rng = random.Random(i)
+        for _ in range(requests_per_user):
+            try:
+                renders, route = simulate_session(
+                    locations[i],
+                    (args.impact_lat, args.impact_lng),
+                    rng.choice(asteroid_names),
+                    rng.randint(5, 60)
+                )
+            except Exception as e:
+                with lock:
+                    errors.append(f"{type(e).__name__}: {e}")
+                continue
+            with lock:
+                render_times.extend(renders)
+                route_times.append(route)
+
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=users) as executor:
+            list(executor.map(user_session, range(users)))
+        elapsed = time.perf_counter() - started
+
+    def percentile(values, q):
+        return float(np.percentile(np.array(values) * 1000, q)) if values else float("nan")
+
+    return {
+        "users": users,
+        "sessions": len(route_times) + len(errors),
+        "errors": len(errors),
+        "renders_per_s": len(render_times) / elapsed,
+        "render_p50_ms": percentile(render_times, 50),
+        "render_p95_ms": percentile(render_times, 95),
+        "render_p99_ms": percentile(render_times, 99),
+        "route_p50_ms": percentile(route_times, 50),
+        "route_p95_ms": percentile(route_times, 95),
+        "rss_delta_mb": (rss.peak - rss.baseline) / 1e6,
+        "rss_mb_per_user": (rss.peak - rss.baseline) / 1e6 / users,
+        "error_causes": Counter(errors)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the Impact Zone pipeline")
+    parser.add_argument("--users", default="1,5,10,25", help="comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=10, help="sessions per simulated user")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="mean stub ORS latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="stub ORS error probability")
+    parser.add_argument("--impact-lat", type=float, default=52.2550)
+    parser.add_argument("--impact-lng", type=float, default=21.0400)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    utils.client = StubORSClient(args.latency_ms, args.error_rate, args.seed)
+    share_script_cache()
+
+    results = []
+    for users in [int(u) for u in args.users.split(",")]:
+        # Komunikaty "Błąd ORS" z get_route_info zaśmieciłyby raport
+        with contextlib.redirect_stdout(io.StringIO()):
+            results.append(run_stage(users, args.requests, args))
+
+    causes = [result.pop("error_causes") for result in results]
+    print(pd.DataFrame(results).round(2).to_string(index=False))
+    print(f"RSS: {psutil.Process().memory_info().rss / 1e6:.0f} MB")
+
+    for result, stage_causes in zip(results, causes):
+        for cause, count in stage_causes.most_common():
+            print(f"users={result['users']}: {count}x {cause}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,14 @@
+import numpy as np
 import streamlit as st
 from .utils import get_route_info
-from .evacuation_planner import haversine
+from .evacuation_planner import haversine, haversine_np
+from .route_safety import route_safety_margins
+
+SAFETY_BUFFER_KM = 0.5  # trasy bliżej granicy strefy niż bufor dostają karę w scoringu
 
 @st.cache_data
-def ai_select_evacuation(user_location, shelters_df, impact_lat, impact_lng, shockwave_radius_km, time_to_impact_min, ors_api_key=None):
+def ai_select_evacuation(user_location, shelters_df, impact_lat, impact_lng, shockwave_radius_km, time_to_impact_min, ors_api_key=None,
+                         shockwave_speed_km_min=0.0, max_radius_km=None):
     """
     Wybiera najlepszą trasę ewakuacyjną na podstawie dystansu, czasu do uderzenia i promienia zagrożenia.
 
@@ -13,14 +18,40 @@ def ai_select_evacuation(user_location, shelters_df, impact_lat, impact_lng, sho
     shockwave_radius_km: float - aktualny promień fali uderzeniowej
     time_to_impact_min: int - czas pozostały do uderzenia
     ors_api_key: str - klucz API do OpenRouteService
+    shockwave_speed_km_min: float - prędkość rozszerzania się fali (km/min)
+    max_radius_km: float - maksymalny zasięg fali uderzeniowej
+    """
+    return plan_evacuation(
+        user_location,
+        shelters_df,
+        impact_lat,
+        impact_lng,
+        shockwave_radius_km,
+        time_to_impact_min,
+        shockwave_speed_km_min=shockwave_speed_km_min,
+        max_radius_km=max_radius_km
+    )
+
+def plan_evacuation(user_location, shelters_df, impact_lat, impact_lng, shockwave_radius_km, time_to_impact_min, route_fn=get_route_info,
+                    shockwave_speed_km_min=0.0, max_radius_km=None):
+    """
+    Logika wyboru ewakuacji bez cache Streamlit - do użycia poza skryptem
+    (prekomputacja, wątki w tle). Nie modyfikuje przekazanego shelters_df.
+
+    route_fn: funkcja (start, end) -> lista tras w formacie get_route_info
+
+    Trasy przechodzące przez strefę zagrożenia w chwili przejazdu są odrzucane,
+    a te zbliżające się do jej granicy bardziej niż SAFETY_BUFFER_KM - karane.
+    Bez bezpiecznej trasy ORS wybierany jest najbliższy schron, do którego fala
+    nie dotrze przed użytkownikiem; gdy takiego nie ma - None.
     """
     candidates = []
 
-    # 🔹 wybierz 5 najbliższych schronów do użytkownika
-    shelters_df["dist_to_user"] = shelters_df.apply(
-        lambda row: haversine((user_location["lat"], user_location["lng"]), (row["lat"], row["lng"])),
-        axis=1
-    )
+    # 🔹 wybierz 3 najbliższe schrony do użytkownika
+    shelters_df = shelters_df.assign(dist_to_user=haversine_np(
+        user_location["lat"], user_location["lng"],
+        shelters_df["lat"].to_numpy(), shelters_df["lng"].to_numpy()
+    ))
     nearest_shelters = shelters_df.nsmallest(3, "dist_to_user")
 
     for _, row in nearest_shelters.iterrows():
@@ -31,7 +62,7 @@ def ai_select_evacuation(user_location, shelters_df, impact_lat, impact_lng, sho
         if distance_to_impact > shockwave_radius_km:
             try:
                 # Pobieramy możliwe trasy z ORS (z cache)
-                routes = get_route_info((user_location["lat"], user_location["lng"]), shelter_coords)
+                routes = route_fn((user_location["lat"], user_location["lng"]), shelter_coords)
             except:
                 continue
 
@@ -50,14 +81,44 @@ def ai_select_evacuation(user_location, shelters_df, impact_lat, impact_lng, sho
                         "score": score
                     })
 
+    # Sprawdzamy trasy względem rozszerzającej się fali (wszystkie kandydatki naraz)
+    margins = route_safety_margins(
+        [c["route"] for c in candidates],
+        [c["duration"] for c in candidates],
+        impact_lat,
+        impact_lng,
+        shockwave_radius_km,
+        shockwave_speed_km_min,
+        max_radius_km
+    )
+    safe_candidates = []
+    for candidate, margin in zip(candidates, margins):
+        if margin < 0:
+            continue
+        if margin < SAFETY_BUFFER_KM:
+            candidate["score"] -= (SAFETY_BUFFER_KM - margin) * 20
+        safe_candidates.append(candidate)
+    candidates = safe_candidates
+
     # Sortujemy po score i zwracamy najlepszą opcję
     candidates.sort(key=lambda x: x["score"], reverse=True)
     if candidates:
         return candidates[0]
 
-    # Fallback: najbliższy schron bez trasy ORS
-    if not nearest_shelters.empty:
-        nearest = nearest_shelters.iloc[0]
+    # Fallback: najbliższy schron bez trasy ORS - tylko taki, do którego
+    # fala nie dotrze przed nami (szacowany czas dojścia / dojazdu)
+    dist_to_user = shelters_df["dist_to_user"].to_numpy()
+    fallback_duration = np.where(dist_to_user < 0.5, dist_to_user * 12, dist_to_user * 2)
+    hazard_km = shockwave_radius_km + shockwave_speed_km_min * fallback_duration
+    if max_radius_km is not None:
+        hazard_km = np.minimum(hazard_km, max(max_radius_km, shockwave_radius_km))
+    shelter_impact_km = haversine_np(
+        impact_lat, impact_lng, shelters_df["lat"].to_numpy(), shelters_df["lng"].to_numpy()
+    )
+    safe_shelters = shelters_df[shelter_impact_km > hazard_km]
+
+    if not safe_shelters.empty:
+        nearest = safe_shelters.iloc[safe_shelters["dist_to_user"].to_numpy().argmin()]
         min_dist = nearest["dist_to_user"]
 
         return {
@@ -70,7 +131,8 @@ def ai_select_evacuation(user_location, shelters_df, impact_lat, impact_lng, sho
                 [user_location["lat"], user_location["lng"]],
                 [nearest["lat"], nearest["lng"]]
             ],
-            "score": 0
+            "score": 0,
+            "fallback": True  # bez trasy ORS - nie nadaje się do prekomputowanych tablic
         }
 
     return None
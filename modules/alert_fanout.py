@@ -0,0 +1,211 @@
+import json
+import math
+import queue
+from typing import Dict, Iterator
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from .evacuation_planner import haversine_np
+from .zagrozenie import ImpactZone
+
+KM_PER_DEG_LAT = 111.32
+
+# Pierścienie od środka - subskrybent trafia do pierwszej strefy, która go obejmuje
+RING_ZONES = [
+    "crater_km",
+    "total_destruction_km",
+    "severe_damage_km",
+    "moderate_damage_km",
+    "light_damage_km",
+    "shockwave_radius_km"
+]
+
+class SubscriberStore:
+    """
+    Lokalizacje subskrybentów alertów w tablicach mapowanych z dysku.
+
+    Punkty są posortowane po komórkach siatki (cell_deg x cell_deg), a indeks
+    offsets (jak w CSR) wskazuje zakres punktów każdej komórki. Zapytanie o okrąg
+    czyta tylko wiersze siatki, które go przecinają - ciągłe wycinki pliku.
+
+    Pliki: <prefix>.coords.npy (float32 lat/lng), <prefix>.ids.npy (int64 id
+    subskrybenta), <prefix>.offsets.npy, <prefix>.meta.json
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        with open(f"{prefix}.meta.json", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.coords = np.load(f"{prefix}.coords.npy", mmap_mode="r")
+        self.ids = np.load(f"{prefix}.ids.npy", mmap_mode="r")
+        self.offsets = np.load(f"{prefix}.offsets.npy", mmap_mode="r")
+
+    def __len__(self):
+        return len(self.coords)
+
+    @staticmethod
+    def _cell_ids(coords, meta):
+        rows = ((coords[:, 0] - meta["min_lat"]) / meta["cell_deg"]).astype(np.int64)
+        cols = ((coords[:, 1] - meta["min_lng"]) / meta["cell_deg"]).astype(np.int64)
+        return np.clip(rows, 0, meta["rows"] - 1) * meta["cols"] + np.clip(cols, 0, meta["cols"] - 1)
+
+    @classmethod
+    def build(cls, prefix: str, coords, ids=None, cell_deg: float = 0.05, chunk_size: int = 1_000_000) -> "SubscriberStore":
+        """
+        Buduje magazyn z tablicy (N, 2) lat/lng - może to być np.memmap.
+        Sortowanie kubełkowe w trzech przebiegach po paczkach, więc pamięć
+        zależy od chunk_size i liczby komórek, a nie od N.
+        """
+        n = len(coords)
+        chunks = range(0, n, chunk_size)
+
+        # 1. Zakres siatki
+        min_lat = min_lng = np.inf
+        max_lat = max_lng = -np.inf
+        for start in chunks:
+            chunk = np.asarray(coords[start:start + chunk_size])
+            min_lat, min_lng = min(min_lat, chunk[:, 0].min()), min(min_lng, chunk[:, 1].min())
+            max_lat, max_lng = max(max_lat, chunk[:, 0].max()), max(max_lng, chunk[:, 1].max())
+
+        meta = {
+            "min_lat": float(min_lat),
+            "min_lng": float(min_lng),
+            "cell_deg": cell_deg,
+            "rows": int((max_lat - min_lat) // cell_deg) + 1,
+            "cols": int((max_lng - min_lng) // cell_deg) + 1,
+            "count": n
+        }
+        n_cells = meta["rows"] * meta["cols"]
+
+        # 2. Liczność komórek -> offsets
+        counts = np.zeros(n_cells, dtype=np.int64)
+        for start in chunks:
+            counts += np.bincount(cls._cell_ids(np.asarray(coords[start:start + chunk_size]), meta), minlength=n_cells)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        # 3. Rozrzucenie punktów na miejsca w plikach wyjściowych
+        out_coords = np.lib.format.open_memmap(f"{prefix}.coords.npy", mode="w+", dtype=np.float32, shape=(n, 2))
+        out_ids = np.lib.format.open_memmap(f"{prefix}.ids.npy", mode="w+", dtype=np.int64, shape=(n,))
+        cursor = offsets[:-1].copy()
+        for start in chunks:
+            chunk = np.asarray(coords[start:start + chunk_size])
+            cells = cls._cell_ids(chunk, meta)
+            order = np.argsort(cells, kind="stable")
+            cells = cells[order]
+
+            # Pozycja w komórce = kursor komórki + numer kolejny w obrębie paczki
+            first = np.searchsorted(cells, cells, side="left")
+            positions = cursor[cells] + (np.arange(len(cells)) - first)
+            out_coords[positions] = chunk[order]
+            out_ids[positions] = (np.asarray(ids[start:start + chunk_size]) if ids is not None
+                                  else np.arange(start, start + len(chunk)))[order]
+            cursor += np.bincount(cells, minlength=n_cells)
+
+        out_coords.flush()
+        out_ids.flush()
+        np.save(f"{prefix}.offsets.npy", offsets)
+        with open(f"{prefix}.meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        return cls(prefix)
+
+    def row_slices(self, lat: float, lng: float, radius_km: float) -> Iterator[slice]:
+        """Zakresy punktów (po jednym na wiersz siatki) z prostokąta opisanego na okręgu"""
+        meta = self.meta
+        d_lat = radius_km / KM_PER_DEG_LAT
+        d_lng = radius_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+
+        row0 = max(0, int((lat - d_lat - meta["min_lat"]) // meta["cell_deg"]))
+        row1 = min(meta["rows"] - 1, int((lat + d_lat - meta["min_lat"]) // meta["cell_deg"]))
+        col0 = max(0, int((lng - d_lng - meta["min_lng"]) // meta["cell_deg"]))
+        col1 = min(meta["cols"] - 1, int((lng + d_lng - meta["min_lng"]) // meta["cell_deg"]))
+        if col0 > col1:
+            return
+
+        for row in range(row0, row1 + 1):
+            start = int(self.offsets[row * meta["cols"] + col0])
+            stop = int(self.offsets[row * meta["cols"] + col1 + 1])
+            if stop > start:
+                yield slice(start, stop)
+
+def target_subscribers(store: SubscriberStore,
+                       impact_zone: ImpactZone,
+                       shelters_df: pd.DataFrame,
+                       batch_size: int = 100_000) -> Iterator[Dict]:
+    """
+    Strumień paczek subskrybentów w strefach zniszczeń danego ImpactZone.
+
+    Każda paczka (co najwyżej batch_size osób) zawiera id subskrybentów, indeks
+    pierścienia (RING_ZONES) oraz najbliższy schron poza falą uderzeniową
+    (indeks w shelters_df i odległość w km; -1 gdy żaden schron nie jest bezpieczny).
+    """
+    radii = impact_zone.calculate_blast_radius()
+    ring_radii = np.array([radii[z] for z in RING_ZONES])
+    outer_radius = ring_radii[-1]
+    lat0, lng0 = impact_zone.impact_lat, impact_zone.impact_lon
+
+    shelter_lat = shelters_df["lat"].to_numpy()
+    shelter_lng = shelters_df["lng"].to_numpy()
+    safe = np.flatnonzero(haversine_np(lat0, lng0, shelter_lat, shelter_lng) > outer_radius)
+
+    # Drzewo k-d bezpiecznych schronów w lokalnym rzucie (km) - budowane raz,
+    # pamięć paczki rośnie z batch_size, a nie z batch_size x liczba schronów
+    km_per_deg_lng = KM_PER_DEG_LAT * math.cos(math.radians(lat0))
+
+    def project(lat, lng):
+        return np.column_stack([(lng - lng0) * km_per_deg_lng, (lat - lat0) * KM_PER_DEG_LAT])
+
+    tree = cKDTree(project(shelter_lat[safe], shelter_lng[safe])) if len(safe) else None
+    # Rzut zniekształca odległości daleko od uderzenia - kilku kandydatów sprawdzamy dokładnie (haversine)
+    k = min(4, len(safe))
+
+    for rows in store.row_slices(lat0, lng0, outer_radius):
+        for start in range(rows.start, rows.stop, batch_size):
+            coords = np.asarray(store.coords[start:min(start + batch_size, rows.stop)], dtype=float)
+            dist = haversine_np(lat0, lng0, coords[:, 0], coords[:, 1])
+            inside = dist <= outer_radius
+            if not inside.any():
+                continue
+
+            coords = coords[inside]
+            ids = np.asarray(store.ids[start:start + len(inside)])[inside]
+            rings = np.searchsorted(ring_radii, dist[inside], side="left")
+
+            if tree is not None:
+                _, candidates = tree.query(project(coords[:, 0], coords[:, 1]), k=k)
+                candidates = safe[candidates.reshape(len(coords), k)]
+                to_candidates = haversine_np(
+                    coords[:, 0:1], coords[:, 1:2], shelter_lat[candidates], shelter_lng[candidates]
+                )
+                nearest = to_candidates.argmin(axis=1)
+                rows_index = np.arange(len(nearest))
+                shelter_index = candidates[rows_index, nearest]
+                shelter_distance = to_candidates[rows_index, nearest]
+            else:
+                shelter_index = np.full(len(ids), -1)
+                shelter_distance = np.full(len(ids), np.nan)
+
+            yield {
+                "subscriber_ids": ids,
+                "ring": rings,
+                "shelter_index": shelter_index,
+                "shelter_distance_km": shelter_distance
+            }
+
+def fan_out_alerts(store: SubscriberStore,
+                   impact_zone: ImpactZone,
+                   shelters_df: pd.DataFrame,
+                   out_queue: queue.Queue,
+                   batch_size: int = 100_000) -> Dict[str, int]:
+    """
+    Wysyła paczki z target_subscribers do lokalnej kolejki (ograniczona kolejka
+    = naturalny backpressure) i zwraca liczbę powiadomionych osób w każdej strefie
+    """
+    totals = np.zeros(len(RING_ZONES), dtype=np.int64)
+    for batch in target_subscribers(store, impact_zone, shelters_df, batch_size):
+        out_queue.put(batch)
+        totals += np.bincount(batch["ring"], minlength=len(RING_ZONES))
+
+    return {zone: int(count) for zone, count in zip(RING_ZONES, totals)}
@@ -0,0 +1,28 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+def submit_latest(slot: dict, key, executor: ThreadPoolExecutor, fn, *args, **kwargs) -> Future:
+    """
+    Uruchamia fn w tle dla danego klucza wejść, pamiętając tylko najnowsze zadanie.
+
+    slot: słownik na stan zadania (np. wpis w st.session_state)
+    key: hashowalny klucz wejść - ten sam klucz zwraca istniejące zadanie,
+         nowy klucz anuluje poprzednie (jeśli jeszcze nie wystartowało,
+         a jeśli już działa - jego wynik zostanie pominięty)
+    """
+    if slot.get("key") != key:
+        previous = slot.get("future")
+        if previous is not None:
+            previous.cancel()
+        slot["key"] = key
+        slot["future"] = executor.submit(fn, *args, **kwargs)
+    return slot["future"]
+
+def result_if_done(future: Future, default=None) -> Optional[object]:
+    """Wynik zakończonego zadania; default gdy zadanie trwa, zostało anulowane lub zgłosiło błąd"""
+    if not future.done() or future.cancelled():
+        return default
+    if future.exception() is not None:
+        print("Błąd zadania w tle:", future.exception())
+        return default
+    return future.result()
@@ -0,0 +1,80 @@
+import threading
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from .evacuation_planner import haversine_np
+
+class CoverageAnalysis:
+    """
+    Dostępność zasobów po uderzeniu: dla każdego schronu najbliższy ocalały
+    punkt każdego typu (AED, woda, pomoc medyczna).
+
+    Przy tworzeniu liczone są raz (dla scenariusza) odległości schron-punkt
+    i kolejność punktów od najbliższego. Punkt jest zniszczony, gdy leży w
+    promieniu zniszczeń, więc przy rosnącym promieniu (suwak czasu) wskaźnik
+    "najbliższy ocalały" dla każdego schronu tylko przesuwa się do przodu -
+    aktualizacja kosztuje tyle, ile punktów zostało nowo zniszczonych.
+    """
+
+    def __init__(self, shelters_df: pd.DataFrame, facility_layers: Dict[str, pd.DataFrame], impact_lat: float, impact_lng: float):
+        self.shelters_df = shelters_df.reset_index(drop=True)
+        self.shelter_impact_km = haversine_np(
+            impact_lat, impact_lng, self.shelters_df["lat"].to_numpy(), self.shelters_df["lng"].to_numpy()
+        )
+        self._lock = threading.Lock()
+        self._radius = 0.0
+        self._layers = {}
+
+        for name, df in facility_layers.items():
+            df = df.reset_index(drop=True)
+            lat, lng = df["lat"].to_numpy(), df["lng"].to_numpy()
+            distance = haversine_np(
+                self.shelters_df["lat"].to_numpy()[:, None], self.shelters_df["lng"].to_numpy()[:, None],
+                lat[None, :], lng[None, :]
+            )
+            order = np.argsort(distance, axis=1)
+            impact_km = haversine_np(impact_lat, impact_lng, lat, lng)
+            # Sentinel na końcu wiersza: "brak ocalałego punktu"
+            self._layers[name] = {
+                "names": np.append(df["name"].to_numpy(dtype=object), None),
+                "order": np.hstack([order, np.full((len(order), 1), len(df))]),
+                "distance": np.hstack([np.take_along_axis(distance, order, axis=1), np.full((len(order), 1), np.nan)]),
+                "impact_km": np.hstack([impact_km[order], np.full((len(order), 1), np.inf)]),
+                "pointer": np.zeros(len(order), dtype=int)
+            }
+
+    def _advance(self, layer, radius_km):
+        """Przesuwa wskaźniki schronów za punkty zniszczone w promieniu radius_km"""
+        rows = np.arange(len(layer["pointer"]))
+        pointer = layer["pointer"]
+        blocked = layer["impact_km"][rows, pointer] <= radius_km
+        while blocked.any():
+            pointer[blocked] += 1
+            blocked[blocked] = layer["impact_km"][rows[blocked], pointer[blocked]] <= radius_km
+
+    def at(self, destroyed_radius_km: float) -> pd.DataFrame:
+        """
+        Tabela dla schronów przy danym promieniu zniszczeń: czy schron ocalał
+        oraz nazwa i odległość (km) najbliższego ocalałego punktu każdego typu
+        """
+        with self._lock:
+            if destroyed_radius_km < self._radius:
+                # Cofnięcie suwaka - liczymy od początku
+                for layer in self._layers.values():
+                    layer["pointer"][:] = 0
+            self._radius = destroyed_radius_km
+
+            result = pd.DataFrame({
+                "shelter": self.shelters_df["name"],
+                "destroyed": self.shelter_impact_km <= destroyed_radius_km
+            })
+            rows = np.arange(len(self.shelters_df))
+            for name, layer in self._layers.items():
+                self._advance(layer, destroyed_radius_km)
+                pointer = layer["pointer"]
+                result[name] = layer["names"][layer["order"][rows, pointer]]
+                result[f"{name}_km"] = layer["distance"][rows, pointer].round(2)
+
+        return result
@@ -0,0 +1,282 @@
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .ai_planner import plan_evacuation
+from .evacuation_planner import haversine_np
+from .poi_tiles import circle_bbox
+from .utils import get_route_info
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def geohash_encode(lat, lng, precision=6):
+    """
+    Koduje punkt (lat, lng) do geohasha o zadanej długości.
+    precision 6 ≈ 1.2 x 0.6 km, precision 7 ≈ 150 x 150 m
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+def geohash_cell_size(precision):
+    """Zwraca rozmiar komórki geohasha (d_lat, d_lng) w stopniach"""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = (5 * precision) // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+def geohash_cells_in_bbox(min_lat, min_lng, max_lat, max_lng, precision=6):
+    """
+    Zwraca listę komórek (geohash, (lat, lng) środka) pokrywających prostokąt
+    """
+    d_lat, d_lng = geohash_cell_size(precision)
+    lat0 = np.floor((min_lat + 90) / d_lat) * d_lat - 90
+    lng0 = np.floor((min_lng + 180) / d_lng) * d_lng - 180
+
+    cells = []
+    for lat in np.arange(lat0 + d_lat / 2, max_lat + d_lat, d_lat):
+        for lng in np.arange(lng0 + d_lng / 2, max_lng + d_lng, d_lng):
+            cells.append((geohash_encode(lat, lng, precision), (float(lat), float(lng))))
+    return cells
+
+class DecisionTileTable:
+    """
+    Tablica prekomputowanych decyzji ewakuacyjnych: geohash komórki -> schron i trasa.
+
+    Dla ustalonego scenariusza (uderzenie, promień, czas) decyzja zależy praktycznie
+    tylko od komórki, w której stoi użytkownik. Tablica jest wypełniana w tle
+    (wątki - wąskim gardłem są wywołania ORS), a zapytanie użytkownika to
+    odczyt ze słownika. Komórki graniczne (różne najbliższe schrony w rogach
+    komórki) są liczone na żądanie dla dokładnej pozycji.
+
+    Do tablicy trafiają tylko decyzje oparte na trasie ORS - awaryjny wybór
+    najbliższego schronu jest pomijany, żeby nie przesłaniał późniejszego
+    routingu na żywo. Komórki, w których ORS nie zwrócił tras (błąd / limit),
+    też nie są zapisywane - ich liczba jest w failed_cells.
+    """
+
+    def __init__(self, shelters_df, impact_lat, impact_lng, shockwave_radius_km, time_to_impact_min,
+                 precision=6, route_fn=get_route_info, shockwave_speed_km_min=0.0, max_radius_km=None):
+        self.shelters_df = shelters_df[["name", "lat", "lng"]].copy()
+        self.impact_lat = impact_lat
+        self.impact_lng = impact_lng
+        self.shockwave_radius_km = shockwave_radius_km
+        self.time_to_impact_min = time_to_impact_min
+        self.shockwave_speed_km_min = shockwave_speed_km_min
+        self.max_radius_km = max_radius_km
+        self.precision = precision
+        self.route_fn = route_fn
+
+        self.tiles = {}
+        self.boundary_cells = set()
+        self.ready = False
+        self.cells_total = 0
+        self.failed_cells = 0
+        self._thread = None
+        self._cancelled = threading.Event()
+
+    def _nearest_shelters(self, lats, lngs, k=3):
+        """Indeksy k najbliższych schronów dla każdego z punktów (tablica N x k)"""
+        dist = haversine_np(
+            np.asarray(lats)[:, None], np.asarray(lngs)[:, None],
+            self.shelters_df["lat"].to_numpy()[None, :], self.shelters_df["lng"].to_numpy()[None, :]
+        )
+        k = min(k, dist.shape[1])
+        nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        return np.sort(nearest, axis=1)
+
+    def _is_boundary(self, lat, lng):
+        """Komórka jest graniczna, jeśli w jej rogach zmienia się zbiór kandydatów"""
+        d_lat, d_lng = geohash_cell_size(self.precision)
+        lats = np.array([lat, lat - d_lat / 2, lat - d_lat / 2, lat + d_lat / 2, lat + d_lat / 2])
+        lngs = np.array([lng, lng - d_lng / 2, lng + d_lng / 2, lng - d_lng / 2, lng + d_lng / 2])
+        nearest = self._nearest_shelters(lats, lngs)
+        return bool((nearest != nearest[0]).any())
+
+    def _compute_cell(self, cell):
+        geohash, (lat, lng) = cell
+        failed = []
+
+        def route_fn(start, end):
+            try:
+                routes = self.route_fn(start, end)
+            except Exception:
+                failed.append(end)
+                raise
+            if not routes:
+                failed.append(end)
+            return routes
+
+        decision = plan_evacuation(
+            {"lat": lat, "lng": lng},
+            self.shelters_df,
+            self.impact_lat,
+            self.impact_lng,
+            self.shockwave_radius_km,
+            self.time_to_impact_min,
+            route_fn=route_fn,
+            shockwave_speed_km_min=self.shockwave_speed_km_min,
+            max_radius_km=self.max_radius_km
+        )
+        return geohash, decision, self._is_boundary(lat, lng), bool(failed)
+
+    def default_region(self, margin_km=2.0):
+        """
+        Obszar obsługiwany domyślnie: strefa zagrożenia (maksymalny zasięg fali)
+        powiększona o margines i przycięta do prostokąta schronów - poza nią
+        ewakuacja nie jest potrzebna
+        """
+        hazard_km = max(self.max_radius_km or 0.0, self.shockwave_radius_km)
+        min_lat, min_lng, max_lat, max_lng = circle_bbox(self.impact_lat, self.impact_lng, hazard_km + margin_km)
+        return (
+            max(min_lat, self.shelters_df["lat"].min()),
+            max(min_lng, self.shelters_df["lng"].min()),
+            min(max_lat, self.shelters_df["lat"].max()),
+            min(max_lng, self.shelters_df["lng"].max())
+        )
+
+    def precompute(self, region=None, max_workers=8):
+        """
+        Wypełnia tablicę dla wszystkich komórek regionu (min_lat, min_lng, max_lat, max_lng).
+        Blokuje do końca obliczeń (albo do cancel()) - do pracy w tle służy start().
+        """
+        # Po uderzeniu żadna trasa nie zdąży (duration < time_to_impact_min) - wywołania ORS byłyby stracone
+        if self.shelters_df.empty or self.time_to_impact_min <= 0:
+            self.ready = True
+            return self
+
+        region = region or self.default_region()
+        cells = iter(geohash_cells_in_bbox(*region, precision=self.precision))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Porcjami, żeby cancel() zatrzymał obliczenia bez czekania na cały region
+            while not self._cancelled.is_set():
+                batch = list(itertools.islice(cells, max_workers * 4))
+                if not batch:
+                    break
+                try:
+                    results = executor.map(self._compute_cell, batch)
+                except RuntimeError:
+                    # Zamykanie interpretera - nowych porcji nie da się już zlecić
+                    self._cancelled.set()
+                    break
+                for geohash, decision, boundary, failed in results:
+                    self.cells_total += 1
+                    if failed:
+                        # Bez kompletu tras decyzja mogłaby być gorsza niż na żywo - liczymy na żądanie
+                        self.failed_cells += 1
+                        continue
+                    if decision is None or decision.get("fallback"):
+                        continue
+                    self.tiles[geohash] = decision
+                    if boundary:
+                        self.boundary_cells.add(geohash)
+
+        if self.failed_cells:
+            print(f"Tablica decyzji: brak tras ORS dla {self.failed_cells} z {self.cells_total} komórek")
+        self.ready = not self._cancelled.is_set()
+        return self
+
+    @property
+    def failed_fraction(self) -> float:
+        """Odsetek policzonych komórek bez tras ORS"""
+        return self.failed_cells / self.cells_total if self.cells_total else 0.0
+
+    def start(self, region=None, max_workers=8):
+        """Uruchamia precompute() w wątku w tle i od razu zwraca tablicę"""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self.precompute,
+                kwargs={"region": region, "max_workers": max_workers},
+                daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def cancel(self):
+        """Przerywa prekomputację w tle (po bieżącej porcji komórek)"""
+        self._cancelled.set()
+
+    def lookup(self, lat, lng):
+        """
+        Odczyt O(1): decyzja dla komórki, w której leży punkt.
+        Zwraca None dla komórek granicznych i jeszcze nie policzonych.
+        """
+        geohash = geohash_encode(lat, lng, self.precision)
+        if geohash in self.boundary_cells:
+            return None
+
+        decision = self.tiles.get(geohash)
+        if decision is None:
+            return None
+
+        # Trasa liczona była ze środka komórki - doklejamy pozycję użytkownika
+        return {**decision, "route": [[lat, lng]] + list(decision["route"])}
+
+    def decide(self, user_location):
+        """Decyzja z tablicy, a dla komórek granicznych / brakujących - liczona na żądanie"""
+        decision = self.lookup(user_location["lat"], user_location["lng"])
+        if decision is not None:
+            return decision
+
+        return plan_evacuation(
+            user_location,
+            self.shelters_df,
+            self.impact_lat,
+            self.impact_lng,
+            self.shockwave_radius_km,
+            self.time_to_impact_min,
+            route_fn=self.route_fn,
+            shockwave_speed_km_min=self.shockwave_speed_km_min,
+            max_radius_km=self.max_radius_km
+        )
+
+class DecisionTileCache:
+    """
+    Ograniczony cache tablic decyzji (LRU). Tablica usuwana z cache ma
+    przerywaną prekomputację, więc jej wątek i pula nie liczą dalej w tle.
+    """
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, factory):
+        """Tablica dla klucza - istniejąca albo nowa z factory() uruchomiona w tle"""
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                return table
+
+            table = factory().start()
+            self._tables[key] = table
+            while len(self._tables) > self.max_entries:
+                _, evicted = self._tables.popitem(last=False)
+                evicted.cancel()
+            return table
@@ -1,5 +1,9 @@
 from math import radians, cos, sin, asin, sqrt
 
+import numpy as np
+
+EARTH_RADIUS_KM = 6371  # promień Ziemi w km
+
 def haversine(coord1, coord2):
     """
     Oblicza odległość w kilometrach między dwoma punktami (lat, lon)
@@ -15,5 +19,17 @@ def haversine(coord1, coord2):
     dlon = lon2 - lon1
     a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
     c = 2 * asin(sqrt(a))
-    r = 6371  # promień Ziemi w km
+    r = EARTH_RADIUS_KM
     return c * r
+
+def haversine_np(lat1, lon1, lat2, lon2):
+    """
+    Wektorowa wersja haversine (numpy, z broadcastingiem).
+    Przyjmuje skalary lub tablice w stopniach, zwraca odległości w km.
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2)**2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
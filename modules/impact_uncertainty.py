@@ -0,0 +1,124 @@
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .zagrozenie import Asteroid, ImpactZone
+
+KM_PER_DEG_LAT = 111.32
+
+DEFAULT_ZONES = ("total_destruction_km", "severe_damage_km", "moderate_damage_km", "light_damage_km")
+# Do tej liczby próbek losowanie w procesie jest szybsze niż przesyłanie zadań do puli
+IN_PROCESS_SAMPLES = 1_000_000
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def _get_pool(workers):
+    """
+    Długo żyjąca pula procesów. Procesy startują przez spawn, nie fork -
+    fork wielowątkowego serwera (Streamlit, wątki tablic decyzji i feedu)
+    może skopiować zablokowane locki i zawiesić proces potomny.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers < workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+def _sample_histogram(seed, n_samples, cov_km, edges_x, edges_y):
+    """
+    Worker: losuje n_samples punktów uderzenia z rozkładu N(0, cov_km)
+    (przesunięcia wschód/północ w km) i zlicza je na siatce.
+    """
+    rng = np.random.default_rng(seed)
+    offsets = rng.multivariate_normal([0.0, 0.0], cov_km, size=n_samples)
+    counts, _, _ = np.histogram2d(offsets[:, 1], offsets[:, 0], bins=[edges_y, edges_x])
+    return counts
+
+def _disc_kernel(radius_km, cell_km):
+    """Maska koła o promieniu radius_km na siatce o boku komórki cell_km"""
+    r_cells = int(math.ceil(radius_km / cell_km))
+    ax = np.arange(-r_cells, r_cells + 1) * cell_km
+    return (ax[None, :] ** 2 + ax[:, None] ** 2 <= radius_km ** 2).astype(float)
+
+def _convolve_same(counts, kernel):
+    """Splot 2D przez FFT, wynik w rozmiarze counts"""
+    ky, kx = kernel.shape
+    shape = (counts.shape[0] + ky - 1, counts.shape[1] + kx - 1)
+    result = np.fft.irfft2(np.fft.rfft2(counts, shape) * np.fft.rfft2(kernel, shape), shape)
+    oy, ox = ky // 2, kx // 2
+    return result[oy:oy + counts.shape[0], ox:ox + counts.shape[1]]
+
+def impact_exceedance_grid(asteroid: Asteroid,
+                           mean_lat: float,
+                           mean_lon: float,
+                           cov_km,
+                           n_samples: int = 100_000,
+                           grid_size: int = 200,
+                           zones=DEFAULT_ZONES,
+                           workers: int = None,
+                           seed: int = None):
+    """
+    Probabilistyczny wariant calculate_impact_for_location (Monte Carlo).
+
+    Punkt uderzenia losowany jest z elipsy niepewności N(mean, cov_km), gdzie
+    cov_km to macierz kowariancji 2x2 przesunięć [wschód, północ] w km.
+    Promienie stref zależą tylko od asteroidy, więc dla każdej strefy
+    prawdopodobieństwo przekroczenia w komórce = histogram punktów uderzenia
+    splecony z kołem o promieniu strefy. Duże losowania (powyżej IN_PROCESS_SAMPLES
+    albo z jawnym workers > 1) są rozdzielane na procesy współdzielonej puli.
+
+    Returns:
+        Dict z granicami siatki i tablicami P(strefa obejmuje komórkę)
+        (wiersze od południa do północy)
+    """
+    cov_km = np.asarray(cov_km, dtype=float)
+    radii = ImpactZone(asteroid, mean_lat, mean_lon).calculate_blast_radius()
+
+    # Siatka: 4 sigma elipsy + największa strefa
+    sigma_max = math.sqrt(float(np.linalg.eigvalsh(cov_km).max()))
+    half_extent_km = 4 * sigma_max + max(radii[z] for z in zones)
+    edges = np.linspace(-half_extent_km, half_extent_km, grid_size + 1)
+    cell_km = edges[1] - edges[0]
+
+    if workers is None:
+        workers = 1 if n_samples <= IN_PROCESS_SAMPLES else os.cpu_count() or 1
+    chunks = [len(c) for c in np.array_split(np.arange(n_samples), workers) if len(c)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+
+    if len(chunks) == 1:
+        counts = _sample_histogram(seeds[0], chunks[0], cov_km, edges, edges)
+    else:
+        parts = _get_pool(len(chunks)).map(
+            _sample_histogram,
+            seeds,
+            chunks,
+            [cov_km] * len(chunks),
+            [edges] * len(chunks),
+            [edges] * len(chunks)
+        )
+        counts = sum(parts)
+
+    probabilities = {}
+    for zone in zones:
+        hits = _convolve_same(counts, _disc_kernel(radii[zone], cell_km))
+        probabilities[zone] = np.clip(hits / n_samples, 0.0, 1.0)
+
+    km_per_deg_lon = KM_PER_DEG_LAT * math.cos(math.radians(mean_lat))
+    return {
+        "asteroid_name": asteroid.name,
+        "n_samples": n_samples,
+        "bounds": [
+            [mean_lat - half_extent_km / KM_PER_DEG_LAT, mean_lon - half_extent_km / km_per_deg_lon],
+            [mean_lat + half_extent_km / KM_PER_DEG_LAT, mean_lon + half_extent_km / km_per_deg_lon]
+        ],
+        "probabilities": probabilities
+    }
@@ -1,4 +1,5 @@
 import folium
+import numpy as np
 import pandas as pd
 
 def add_zones(map_object, circles_coordinates: dict):
@@ -141,3 +142,23 @@ def add_water_points(map_object, water_points_df: pd.DataFrame):
             popup=row["name"],
             icon=folium.Icon(color="blue", icon="tint", prefix="fa")
         ).add_to(map_object)
+
+def add_probability_heatmap(map_object, probability_grid: dict, zone: str = "severe_damage_km"):
+    probabilities = probability_grid["probabilities"].get(zone)
+    if probabilities is None:
+        return
+
+    # Obraz RGBA: od żółtego (małe P) do czerwonego, przezroczystość rośnie z P.
+    # Wiersze siatki idą od południa, obraz rysowany jest od góry - odwracamy.
+    p = np.flipud(probabilities)
+    image = np.zeros(p.shape + (4,))
+    image[..., 0] = 1.0
+    image[..., 1] = 1.0 - p
+    image[..., 3] = np.where(p > 0.001, 0.2 + 0.6 * p, 0.0)
+
+    folium.raster_layers.ImageOverlay(
+        image=image,
+        bounds=probability_grid["bounds"],
+        mercator_project=True,
+        name=f"P({zone.replace('_km', '').replace('_', ' ')})"
+    ).add_to(map_object)
@@ -10,7 +10,8 @@ from .map_layers import (
     add_aed_locations,
     add_medical_points,
     add_aed_locations,
-    add_water_points
+    add_water_points,
+    add_probability_heatmap
 )
 
 def render_map(
@@ -20,7 +21,8 @@ def render_map(
     medical_points_df: pd.DataFrame,
     water_points_df: pd.DataFrame,
     user_location=None,
-    evacuation_routes=None
+    evacuation_routes=None,
+    probability_grid=None
 ):
 
 
@@ -32,7 +34,11 @@ def render_map(
 
     m = folium.Map(location=[lat, lng], zoom_start=10)
 
-    add_zones(m, asteroid_data.get("circles_coordinates", {}))
+    # Mapa prawdopodobieństwa zamiast okręgów, gdy punkt uderzenia jest niepewny
+    if probability_grid:
+        add_probability_heatmap(m, probability_grid)
+    else:
+        add_zones(m, asteroid_data.get("circles_coordinates", {}))
     add_impact_marker(m, lat, lng, asteroid_data["asteroid_name"])
     add_shelters(m, shelters_df)
     add_aed_locations(m, aed_df)
@@ -0,0 +1,187 @@
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+AU_KM = 149597870.7
+GM_SUN_KM3_S2 = 1.32712440018e11
+J2000_JD = 2451545.0
+J2000_DATETIME = datetime(2000, 1, 1, 12, 0, 0)
+
+@dataclass
+class OrbitalElements:
+    """Keplerowskie elementy orbity heliocentrycznej (ekliptyka J2000)"""
+    a_au: float  # Półoś wielka w AU
+    e: float  # Mimośród (0-1, tylko orbity eliptyczne)
+    i_deg: float  # Nachylenie
+    raan_deg: float  # Długość węzła wstępującego
+    argp_deg: float  # Argument perycentrum
+    mean_anomaly_deg: float  # Anomalia średnia w epoce
+    epoch_jd: float = J2000_JD  # Epoka elementów (JD)
+
+# Przybliżone elementy orbity Ziemi (barycentrum Ziemia-Księżyc) dla J2000
+EARTH_ELEMENTS = OrbitalElements(
+    a_au=1.00000261,
+    e=0.01671123,
+    i_deg=0.0,
+    raan_deg=0.0,
+    argp_deg=102.93768193,
+    mean_anomaly_deg=-2.47311027,
+    epoch_jd=J2000_JD
+)
+
+def date_to_jd(date: str) -> float:
+    """Data 'YYYY-MM-DD' -> dzień juliański"""
+    delta = datetime.strptime(date, "%Y-%m-%d") - J2000_DATETIME
+    return J2000_JD + delta.total_seconds() / 86400
+
+def jd_to_date(jd: float) -> str:
+    """Dzień juliański -> data 'YYYY-MM-DD'"""
+    return (J2000_DATETIME + timedelta(days=float(jd) - J2000_JD)).strftime("%Y-%m-%d")
+
+def load_orbital_elements(filepath: str) -> Dict[str, OrbitalElements]:
+    """
+    Wczytuje elementy orbit z pliku JSON: {"nazwa asteroidy": {"a_au": ..., "e": ..., ...}}.
+    Epoka może być podana jako epoch_jd albo data 'YYYY-MM-DD' w polu epoch.
+    """
+    with open(filepath, encoding="utf-8") as f:
+        data = json.load(f)
+
+    orbits = {}
+    for name, record in data.items():
+        record = dict(record)
+        if "epoch" in record:
+            record["epoch_jd"] = date_to_jd(record.pop("epoch"))
+        orbits[name] = OrbitalElements(**record)
+    return orbits
+
+def solve_kepler(mean_anomaly, e, tol: float = 1e-12, max_iter: int = 30):
+    """
+    Rozwiązuje równanie Keplera M = E - e sin E metodą Newtona,
+    wektorowo dla dowolnych (broadcastowalnych) tablic M i e
+    """
+    mean_anomaly = np.mod(mean_anomaly, 2 * np.pi)
+    e = np.broadcast_to(e, mean_anomaly.shape)
+    # Dla dużych mimośrodów start od pi zbiega pewniej
+    E = np.where(e < 0.8, mean_anomaly, np.pi)
+
+    for _ in range(max_iter):
+        delta = (E - e * np.sin(E) - mean_anomaly) / (1 - e * np.cos(E))
+        E = E - delta
+        if np.abs(delta).max() < tol:
+            break
+
+    return E
+
+def _elements_to_arrays(elements: List[OrbitalElements]):
+    """Lista elementów -> kolumny (N, 1) gotowe do broadcastu po osi czasu"""
+    def column(name):
+        return np.array([getattr(el, name) for el in elements], dtype=float)[:, None]
+
+    return (
+        column("a_au") * AU_KM,
+        column("e"),
+        np.radians(column("i_deg")),
+        np.radians(column("raan_deg")),
+        np.radians(column("argp_deg")),
+        np.radians(column("mean_anomaly_deg")),
+        column("epoch_jd")
+    )
+
+def propagate_positions(elements: List[OrbitalElements], jd) -> np.ndarray:
+    """
+    Pozycje heliocentryczne (km, ekliptyka) w przybliżeniu dwóch ciał
+
+    Args:
+        elements: lista N obiektów OrbitalElements
+        jd: tablica T chwil (dni juliańskie) wspólnych dla obiektów
+            albo tablica (N, T) - osobne chwile dla każdego obiektu
+
+    Returns:
+        Tablica (N, T, 3)
+    """
+    a, e, i, raan, argp, m0, epoch = _elements_to_arrays(elements)
+    jd = np.asarray(jd, dtype=float)
+    if jd.ndim == 1:
+        jd = jd[None, :]
+
+    n = np.sqrt(GM_SUN_KM3_S2 / a ** 3) * 86400  # ruch średni w rad/dzień
+    E = solve_kepler(m0 + n * (jd - epoch), e)
+
+    # Pozycja w płaszczyźnie orbity (perycentrum na osi x)
+    x_orb = a * (np.cos(E) - e)
+    y_orb = a * np.sqrt(1 - e ** 2) * np.sin(E)
+
+    cos_w, sin_w = np.cos(argp), np.sin(argp)
+    cos_o, sin_o = np.cos(raan), np.sin(raan)
+    cos_i, sin_i = np.cos(i), np.sin(i)
+
+    x = (cos_o * cos_w - sin_o * sin_w * cos_i) * x_orb + (-cos_o * sin_w - sin_o * cos_w * cos_i) * y_orb
+    y = (sin_o * cos_w + cos_o * sin_w * cos_i) * x_orb + (-sin_o * sin_w + cos_o * cos_w * cos_i) * y_orb
+    z = (sin_w * sin_i) * x_orb + (cos_w * sin_i) * y_orb
+
+    return np.stack([x, y, z], axis=-1)
+
+def _refine_minimum(elements: List[OrbitalElements], lo: np.ndarray, hi: np.ndarray, iterations: int = 40):
+    """
+    Minimum odległości od Ziemi w przedziale [lo, hi] osobnym dla każdego obiektu
+    (wektorowa metoda złotego podziału na propagowanych pozycjach)
+
+    Returns:
+        (distance_km, epoch_jd)
+    """
+    def distance(t):
+        t = t[:, None]
+        return np.linalg.norm(
+            propagate_positions(elements, t)[:, 0] - propagate_positions([EARTH_ELEMENTS], t)[:, 0], axis=-1
+        )
+
+    ratio = (np.sqrt(5) - 1) / 2
+    for _ in range(iterations):
+        x1 = hi - ratio * (hi - lo)
+        x2 = lo + ratio * (hi - lo)
+        left = distance(x1) < distance(x2)
+        hi = np.where(left, x2, hi)
+        lo = np.where(left, lo, x1)
+
+    epoch = (lo + hi) / 2
+    return distance(epoch), epoch
+
+def find_close_approaches(elements: List[OrbitalElements],
+                          start_jd: float,
+                          end_jd: float,
+                          step_days: float = 0.25,
+                          max_chunk_points: int = 4_000_000) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Minimalna odległość od Ziemi i jej epoka dla każdego obiektu w oknie czasowym.
+
+    Obiekty są przetwarzane paczkami (N_paczki x T <= max_chunk_points), więc pamięć
+    nie rośnie z rozmiarem katalogu. Minimum z siatki jest doprecyzowane
+    minimalizacją 1-D między sąsiednimi próbkami - odległość przy bliskim
+    przelocie ma kształt litery V, więc interpolacja z samej siatki ją zawyża.
+
+    Returns:
+        (min_distance_km, epoch_jd) - tablice długości N
+    """
+    jd = np.arange(start_jd, end_jd + step_days, step_days)
+    earth = propagate_positions([EARTH_ELEMENTS], jd)[0]
+
+    chunk_size = max(1, max_chunk_points // len(jd))
+    min_distance = np.empty(len(elements))
+    min_epoch = np.empty(len(elements))
+
+    for start in range(0, len(elements), chunk_size):
+        chunk = elements[start:start + chunk_size]
+        distance = np.linalg.norm(propagate_positions(chunk, jd) - earth[None, :, :], axis=-1)
+
+        best = distance.argmin(axis=1)
+        lo = jd[np.maximum(best - 1, 0)]
+        hi = jd[np.minimum(best + 1, len(jd) - 1)]
+
+        refined, epoch = _refine_minimum(chunk, lo, hi)
+        min_distance[start:start + len(chunk)] = refined
+        min_epoch[start:start + len(chunk)] = epoch
+
+    return min_distance, min_epoch
@@ -0,0 +1,139 @@
+import itertools
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable
+
+import pandas as pd
+
+def _freeze(value):
+    """Zamienia listy / słowniki na krotki, żeby dało się ich użyć w kluczu cache"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _same(a, b) -> bool:
+    """Porównanie wyników dla cutoff; wartości nieporównywalne traktujemy jako różne"""
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+def _quantize(value, step):
+    if step is None or value is None:
+        return value
+    return round(round(value / step) * step, 10)
+
+class _Node:
+    def __init__(self, name: str, fn: Callable, inputs: Iterable[str], deps: Iterable[str], quantize: Dict[str, float],
+                 cache_size: int, cutoff: bool):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.deps = tuple(deps)
+        self.quantize = quantize or {}
+        self.cache_size = cache_size
+        self.cutoff = cutoff
+        self.cache = OrderedDict()  # klucz -> (wartość, wersja)
+        self.last = None
+        self.calls = 0
+        self.hits = 0
+        self.total_ms = 0.0
+        self.last_ms = 0.0
+
+class DataflowGraph:
+    """
+    Mały graf przepływu danych z memoizacją per węzeł.
+
+    Węzeł to funkcja wywoływana z wartościami swoich zależności (deps) i wybranych
+    wejść zewnętrznych (inputs, opcjonalnie kwantyzowanych). Kluczem cache węzła
+    są jego wejścia i wersje wyników zależności, więc zmiana jednego wejścia
+    przelicza tylko węzły, które od niego (pośrednio) zależą. Węzeł z cutoff=True,
+    który po przeliczeniu da taki sam wynik jak poprzednio, zachowuje wersję -
+    zależne od niego węzły nie są wtedy przeliczane.
+
+    Użycie:
+        graph.set_inputs(**wejścia)  # nowy przebieg (np. rerun Streamlit)
+        graph.get("nazwa_węzła")
+    """
+
+    def __init__(self, cache_size: int = 4):
+        self.cache_size = cache_size
+        self._nodes: Dict[str, _Node] = {}
+        self._inputs = {}
+        self._resolved = {}
+        self._versions = itertools.count()
+
+    def node(self, name: str = None, inputs: Iterable[str] = (), deps: Iterable[str] = (),
+             quantize: Dict[str, float] = None, cache_size: int = None, cutoff: bool = False):
+        """Dekorator rejestrujący funkcję jako węzeł grafu"""
+        def register(fn):
+            node_name = name or fn.__name__
+            self._nodes[node_name] = _Node(node_name, fn, inputs, deps, quantize, cache_size or self.cache_size, cutoff)
+            return fn
+        return register
+
+    def set_inputs(self, **inputs):
+        """Ustawia wejścia zewnętrzne i rozpoczyna nowy przebieg"""
+        self._inputs = inputs
+        self._resolved = {}
+
+    def update_inputs(self, **inputs):
+        """Dokłada wejścia w trakcie przebiegu (np. wynik liczony poza grafem)"""
+        self._inputs.update(inputs)
+
+    def _resolve(self, name: str):
+        if name in self._resolved:
+            return self._resolved[name]
+
+        node = self._nodes[name]
+        deps = {d: self._resolve(d) for d in node.deps}
+        inputs = {i: _quantize(self._inputs[i], node.quantize.get(i)) for i in node.inputs}
+        key = (_freeze(inputs), tuple(version for _, version in deps.values()))
+
+        node.calls += 1
+        if key in node.cache:
+            node.hits += 1
+            node.cache.move_to_end(key)
+            result = node.cache[key]
+            node.last = result
+        else:
+            start = time.perf_counter()
+            value = node.fn(**{d: value for d, (value, _) in deps.items()}, **inputs)
+            node.last_ms = (time.perf_counter() - start) * 1000
+            node.total_ms += node.last_ms
+
+            if node.cutoff and node.last is not None and _same(node.last[0], value):
+                result = node.last
+            else:
+                result = (value, next(self._versions))
+            node.last = result
+            node.cache[key] = result
+            if len(node.cache) > node.cache_size:
+                node.cache.popitem(last=False)
+
+        self._resolved[name] = result
+        return result
+
+    def get(self, name: str):
+        """Wartość węzła dla bieżących wejść (z cache, jeśli wejścia się nie zmieniły)"""
+        return self._resolve(name)[0]
+
+    def version(self, name: str) -> int:
+        """Wersja wyniku węzła w bieżącym przebiegu - zmienia się tylko przy nowym wyniku"""
+        return self._resolve(name)[1]
+
+    def stats(self) -> pd.DataFrame:
+        """Statystyki węzłów: wywołania, trafienia w cache, czasy przeliczeń"""
+        return pd.DataFrame([
+            {
+                "node": node.name,
+                "calls": node.calls,
+                "hits": node.hits,
+                "hit_rate": round(node.hits / node.calls, 2) if node.calls else 0.0,
+                "last_ms": round(node.last_ms, 2),
+                "total_ms": round(node.total_ms, 2)
+            }
+            for node in self._nodes.values()
+        ])
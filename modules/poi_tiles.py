@@ -0,0 +1,124 @@
+import json
+import math
+import os
+import sys
+from functools import lru_cache
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+KM_PER_DEG_LAT = 111.32
+
+# Warstwy POI aplikacji i ich pliki CSV
+POI_LAYERS = {
+    "shelters": "data/shelters.csv",
+    "aed": "data/aed.csv",
+    "water_points": "data/water_points.csv",
+    "medical_points": "data/medical_points.csv"
+}
+
+def circle_bbox(lat: float, lng: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """Prostokąt (min_lat, min_lng, max_lat, max_lng) opisany na okręgu"""
+    d_lat = radius_km / KM_PER_DEG_LAT
+    d_lng = radius_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return lat - d_lat, lng - d_lng, lat + d_lat, lng + d_lng
+
+class TiledPOIStore:
+    """
+    Magazyn POI podzielony na kafle tile_deg x tile_deg stopni.
+
+    Każda warstwa ma osobny plik Parquet na kafel (<katalog>/<warstwa>/<wiersz>_<kolumna>.parquet),
+    a index.json opisuje, które kafle istnieją. Zapytanie o prostokąt czyta tylko
+    kafle, które go przecinają; ostatnio używane kafle trzymane są w cache LRU.
+    """
+
+    def __init__(self, directory: str, cache_size: int = 256):
+        self.directory = directory
+        with open(os.path.join(directory, "index.json"), encoding="utf-8") as f:
+            self.index = json.load(f)
+        self.tile_deg = self.index["tile_deg"]
+        self._read_tile = lru_cache(maxsize=cache_size)(self._read_tile_uncached)
+
+    @staticmethod
+    def _tile_of(lat, lng, tile_deg):
+        return np.floor(lat / tile_deg).astype(int), np.floor(lng / tile_deg).astype(int)
+
+    @classmethod
+    def build(cls, directory: str, layers: Dict[str, pd.DataFrame], tile_deg: float = 0.25) -> "TiledPOIStore":
+        """Dzieli warstwy (DataFrame z kolumnami lat/lng) na kafle i zapisuje indeks"""
+        index = {"tile_deg": tile_deg, "layers": {}}
+
+        for name, df in layers.items():
+            os.makedirs(os.path.join(directory, name), exist_ok=True)
+            rows, cols = cls._tile_of(df["lat"].to_numpy(), df["lng"].to_numpy(), tile_deg)
+            tiles = {}
+            for (row, col), tile_df in df.groupby([rows, cols]):
+                key = f"{row}_{col}"
+                tile_df.reset_index(drop=True).to_parquet(os.path.join(directory, name, f"{key}.parquet"), index=False)
+                tiles[key] = len(tile_df)
+
+            index["layers"][name] = {
+                "columns": list(df.columns),
+                "dtypes": {column: str(dtype) for column, dtype in df.dtypes.items()},
+                "tiles": tiles
+            }
+
+        with open(os.path.join(directory, "index.json"), "w", encoding="utf-8") as f:
+            json.dump(index, f)
+
+        return cls(directory)
+
+    def _read_tile_uncached(self, layer: str, key: str) -> pd.DataFrame:
+        return pd.read_parquet(os.path.join(self.directory, layer, f"{key}.parquet"))
+
+    def _empty(self, layer: str) -> pd.DataFrame:
+        """Pusta warstwa z typami kolumn jak w kaflach (kolumny object psują np. nsmallest)"""
+        info = self.index["layers"][layer]
+        if "dtypes" in info:
+            return pd.DataFrame({column: pd.Series(dtype=info["dtypes"][column]) for column in info["columns"]})
+        # Starszy indeks bez typów - schemat z dowolnego kafla warstwy
+        if info["tiles"]:
+            return self._read_tile(layer, next(iter(info["tiles"]))).iloc[:0]
+        return pd.DataFrame(columns=info["columns"])
+
+    def load(self, layer: str, bbox: Tuple[float, float, float, float]) -> pd.DataFrame:
+        """Punkty warstwy leżące w prostokącie (min_lat, min_lng, max_lat, max_lng)"""
+        min_lat, min_lng, max_lat, max_lng = bbox
+        info = self.index["layers"][layer]
+        row0, col0 = self._tile_of(min_lat, min_lng, self.tile_deg)
+        row1, col1 = self._tile_of(max_lat, max_lng, self.tile_deg)
+
+        frames = [
+            self._read_tile(layer, f"{row}_{col}")
+            for row in range(row0, row1 + 1)
+            for col in range(col0, col1 + 1)
+            if f"{row}_{col}" in info["tiles"]
+        ]
+        if not frames:
+            return self._empty(layer)
+
+        df = pd.concat(frames, ignore_index=True)
+        inside = df["lat"].between(min_lat, max_lat) & df["lng"].between(min_lng, max_lng)
+        return df[inside].reset_index(drop=True)
+
+def load_poi_layers(bbox=None, tiles_dir: str = None) -> Dict[str, pd.DataFrame]:
+    """
+    Warstwy POI dla danego obszaru: z magazynu kafli, jeśli istnieje,
+    a w przeciwnym razie całe pliki CSV (jak dotychczas)
+    """
+    if tiles_dir and bbox and os.path.exists(os.path.join(tiles_dir, "index.json")):
+        store = _open_store(tiles_dir)
+        return {name: store.load(name, bbox) for name in POI_LAYERS}
+
+    return {name: pd.read_csv(path) for name, path in POI_LAYERS.items()}
+
+@lru_cache(maxsize=4)
+def _open_store(tiles_dir: str) -> TiledPOIStore:
+    return TiledPOIStore(tiles_dir)
+
+if __name__ == "__main__":
+    # python -m modules.poi_tiles [katalog wyjściowy]
+    output = sys.argv[1] if len(sys.argv) > 1 else "data/tiles"
+    TiledPOIStore.build(output, {name: pd.read_csv(path) for name, path in POI_LAYERS.items()})
+    print(f"✅ POI tiles saved to: {output}")
@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import OrderedDict
+
+from .utils import get_route_info
+
+class RouteCache:
+    """
+    Pamięć tras ORS między parami punktów (start, cel) - do użycia jako route_fn.
+
+    Trasa z komórki tablicy decyzji do schronu nie zależy od asteroidy ani
+    kroku czasu, więc każda para jest pobierana z ORS raz dla wszystkich
+    tablic i scenariuszy. Liczba równoległych wywołań i odstęp między nimi
+    są ograniczone (limity API). Puste wyniki (błąd / limit ORS) nie są
+    zapamiętywane - kolejne zapytanie spróbuje ponownie.
+    """
+
+    def __init__(self, route_fn=get_route_info, max_concurrent: int = 2, min_interval_s: float = 0.0,
+                 max_entries: int = 200_000, precision: int = 6):
+        self.route_fn = route_fn
+        self.min_interval_s = min_interval_s
+        self.max_entries = max_entries
+        self.precision = precision
+        self.calls = 0
+        self.hits = 0
+        self.failures = 0
+
+        self._routes = OrderedDict()
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(max_concurrent)
+        self._rate_lock = threading.Lock()
+        self._next_call = 0.0
+
+    def _wait_turn(self):
+        """Odstęp min_interval_s między kolejnymi wywołaniami route_fn"""
+        with self._rate_lock:
+            delay = self._next_call - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_call = time.monotonic() + self.min_interval_s
+
+    def __call__(self, start, end):
+        key = tuple(round(float(v), self.precision) for v in (*start, *end))
+        with self._lock:
+            routes = self._routes.get(key)
+            if routes is not None:
+                self._routes.move_to_end(key)
+                self.hits += 1
+                return routes
+
+        with self._slots:
+            self._wait_turn()
+            try:
+                routes = self.route_fn(start, end)
+            except Exception as e:
+                print("Błąd ORS:", e)
+                routes = []
+
+        with self._lock:
+            self.calls += 1
+            if not routes:
+                self.failures += 1
+                return routes
+
+            self._routes[key] = routes
+            while len(self._routes) > self.max_entries:
+                self._routes.popitem(last=False)
+        return routes
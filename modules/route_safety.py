@@ -0,0 +1,74 @@
+import numpy as np
+
+from .evacuation_planner import haversine_np
+
+def route_safety_margins(routes, durations_min, impact_lat, impact_lng, shockwave_radius_km,
+                         shockwave_speed_km_min=0.0, max_radius_km=None):
+    """
+    Sprawdza wektorowo, czy trasy nie przechodzą przez strefę zagrożenia
+    w chwili, w której podróżny by tam był.
+
+    Czas dotarcia do każdego wierzchołka liczony jest proporcjonalnie do przebytej
+    odległości (duration_min całej trasy), a promień zagrożenia w tej chwili to
+    min(max_radius_km, shockwave_radius_km + shockwave_speed_km_min * t).
+    Wszystkie wierzchołki wszystkich tras liczone są naraz.
+
+    Liczą się tylko wierzchołki od pierwszego poza strefą - podróżny, który
+    startuje w strefie, nie jest karany za punkt startu i drogę wyjazdu,
+    a trasa odpada dopiero, gdy fala dogoni go po opuszczeniu strefy.
+
+    Args:
+        routes: lista polilinii [[lat, lng], ...]
+        durations_min: czasy przejazdu tras w minutach
+        impact_lat, impact_lng: punkt uderzenia
+        shockwave_radius_km: aktualny promień zagrożenia
+        shockwave_speed_km_min: prędkość rozszerzania się fali (km/min)
+        max_radius_km: maksymalny zasięg fali (domyślnie bez limitu)
+
+    Returns:
+        Tablica marginesów w km dla każdej trasy: najmniejsza odległość od
+        granicy strefy po jej opuszczeniu (ujemna = fala dogania podróżnego
+        albo trasa w ogóle nie wyprowadza ze strefy)
+    """
+    if not routes:
+        return np.empty(0)
+
+    # Pusta polilinia nie ma wierzchołków do sprawdzenia - margines nieskończony
+    result = np.full(len(routes), np.inf)
+    nonempty = np.flatnonzero([len(r) > 0 for r in routes])
+    if not len(nonempty):
+        return result
+
+    routes = [routes[i] for i in nonempty]
+    durations_min = np.asarray(durations_min, dtype=float)[nonempty]
+    lengths = np.array([len(r) for r in routes])
+    points = np.concatenate([np.asarray(r, dtype=float).reshape(-1, 2) for r in routes])
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+
+    # Długości odcinków; pierwszy wierzchołek każdej trasy zaczyna od zera
+    segment = np.zeros(len(points))
+    segment[1:] = haversine_np(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1])
+    segment[starts] = 0.0
+
+    cumulative = np.cumsum(segment)
+    cumulative -= np.repeat(cumulative[starts], lengths)
+    total = np.repeat(np.add.reduceat(segment, starts), lengths)
+    fraction = np.divide(cumulative, total, out=np.zeros_like(cumulative), where=total > 0)
+    arrival_min = fraction * np.repeat(durations_min, lengths)
+
+    hazard_km = shockwave_radius_km + shockwave_speed_km_min * arrival_min
+    if max_radius_km is not None:
+        hazard_km = np.minimum(hazard_km, max(max_radius_km, shockwave_radius_km))
+
+    margin = haversine_np(impact_lat, impact_lng, points[:, 0], points[:, 1]) - hazard_km
+
+    # Liczba wierzchołków poza strefą do danego miejsca trasy (włącznie)
+    outside = (margin >= 0).astype(int)
+    seen = np.cumsum(outside)
+    seen -= np.repeat(seen[starts] - outside[starts], lengths)
+
+    margins = np.minimum.reduceat(np.where(seen > 0, margin, np.inf), starts)
+    never_left = np.isinf(margins)
+    margins[never_left] = np.minimum.reduceat(margin, starts)[never_left]
+    result[nonempty] = margins
+    return result
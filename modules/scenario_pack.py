@@ -0,0 +1,192 @@
+import json
+import mmap
+import struct
+import sys
+import zlib
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .decision_tiles import DecisionTileTable, geohash_encode
+from .route_cache import RouteCache
+from .utils import get_route_info
+from .zagrozenie import AsteroidDatabase, SHOCKWAVE_DURATION_MIN, calculate_shockwave_radius
+
+PACK_MAGIC = b"IZPACK\x00\x00"
+PACK_VERSION = 2
+# Nagłówek: magic, wersja, liczba wpisów, offset indeksu
+_HEADER = struct.Struct("<8sIIQ")
+_INDEX_DTYPE = np.dtype([("key", "S96"), ("offset", "<u8"), ("length", "<u8")])
+# Kroki czasu do uderzenia (min) z tablicami decyzji - cały zakres suwaka aplikacji co 5 minut
+DEFAULT_TIME_STEPS = tuple(range(5, 61, 5))
+# Maksymalny odsetek komórek bez tras ORS, przy którym tablica trafia jeszcze do paczki
+MAX_FAILED_FRACTION = 0.05
+
+def scenario_key(asteroid_name: str, impact_lat: float, impact_lng: float) -> str:
+    """Klucz scenariusza w paczce (współrzędne zaokrąglone do ~10 m)"""
+    return f"{asteroid_name}|{impact_lat:.4f}|{impact_lng:.4f}"
+
+def _build_scenario(db, asteroid, impact_lat, impact_lng, shelters_df, time_steps, route_fn, max_failed_fraction):
+    impact_details = db.calculate_impact_for_location(asteroid, impact_lat, impact_lng)
+    max_radius = impact_details["destruction_zones"]["shockwave_radius_km"]
+
+    evacuation = {}
+    for time_to_impact in time_steps:
+        current_radius = calculate_shockwave_radius(max_radius, time_to_impact)
+        table = DecisionTileTable(
+            shelters_df,
+            impact_lat,
+            impact_lng,
+            round(current_radius, 2),
+            time_to_impact,
+            route_fn=route_fn,
+            shockwave_speed_km_min=max_radius / SHOCKWAVE_DURATION_MIN,
+            max_radius_km=max_radius
+        ).precompute()
+        if table.failed_fraction > max_failed_fraction:
+            raise RuntimeError(
+                f"{asteroid.name} @ ({impact_lat}, {impact_lng}), {time_to_impact} min: "
+                f"brak tras ORS dla {table.failed_cells} z {table.cells_total} komórek - paczka nie została zapisana"
+            )
+        # Komórki graniczne nie trafiają do paczki - dla nich liczymy na żądanie
+        evacuation[str(time_to_impact)] = {
+            "precision": table.precision,
+            "tiles": {gh: d for gh, d in table.tiles.items() if gh not in table.boundary_cells}
+        }
+
+    return {
+        "impact_details": impact_details,
+        "evacuation": evacuation
+    }
+
+def export_scenario_pack(path: str,
+                         db: AsteroidDatabase,
+                         sites: List[Tuple[float, float]],
+                         shelters_df: pd.DataFrame,
+                         time_steps=DEFAULT_TIME_STEPS,
+                         route_fn=get_route_info,
+                         region: str = "",
+                         max_failed_fraction: float = MAX_FAILED_FRACTION) -> int:
+    """
+    Prekomputuje paczkę scenariuszy (wszystkie asteroidy z bazy x punkty uderzenia)
+    do jednego pliku do pracy bez sieci.
+
+    Format: nagłówek (_HEADER), skompresowane zlib bloki JSON, a na końcu
+    posortowany indeks o stałej szerokości rekordu (_INDEX_DTYPE) - do
+    mapowania z dysku i wyszukiwania binarnego bez wczytywania pliku.
+
+    Trasy komórka -> schron są pobierane raz dla całego eksportu (wspólny
+    RouteCache dla wszystkich asteroid, punktów i kroków czasu). Gdy w którejś
+    tablicy odsetek komórek bez tras ORS przekracza max_failed_fraction,
+    zgłaszany jest RuntimeError i plik nie jest zapisywany.
+
+    Raises:
+        RuntimeError: zbyt wiele komórek bez tras ORS
+        ValueError: klucz scenariusza dłuższy niż pole indeksu
+
+    Returns:
+        Liczba zapisanych scenariuszy
+    """
+    entries = {
+        "__meta__": {
+            "version": PACK_VERSION,
+            "created": datetime.now().isoformat(),
+            "region": region,
+            "asteroids": [a.name for a in db.asteroids],
+            "sites": [list(site) for site in sites],
+            "time_steps": list(time_steps)
+        }
+    }
+    if not isinstance(route_fn, RouteCache):
+        route_fn = RouteCache(route_fn)
+
+    key_size = _INDEX_DTYPE["key"].itemsize
+    for asteroid in db.asteroids:
+        for impact_lat, impact_lng in sites:
+            key = scenario_key(asteroid.name, impact_lat, impact_lng)
+            # Dłuższy klucz zostałby po cichu obcięty w indeksie
+            if len(key.encode("utf-8")) > key_size:
+                raise ValueError(f"Scenario key longer than {key_size} bytes: {key!r}")
+            entries[key] = _build_scenario(
+                db, asteroid, impact_lat, impact_lng, shelters_df, time_steps, route_fn, max_failed_fraction
+            )
+
+    keys = sorted(entries)
+    index = np.zeros(len(keys), dtype=_INDEX_DTYPE)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(keys), 0))
+        for i, key in enumerate(keys):
+            blob = zlib.compress(json.dumps(entries[key], ensure_ascii=False, default=float).encode("utf-8"), 6)
+            index[i] = (key.encode("utf-8"), f.tell(), len(blob))
+            f.write(blob)
+
+        index_offset = f.tell()
+        f.write(index.tobytes())
+        f.seek(0)
+        f.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(keys), index_offset))
+
+    return len(keys) - 1
+
+class ScenarioPack:
+    """
+    Odczyt paczki scenariuszy: indeks i dane są mapowane z dysku, więc otwarcie
+    jest natychmiastowe niezależnie od rozmiaru pliku, a odczyt scenariusza to
+    wyszukiwanie binarne + dekompresja jednego bloku (z cache LRU).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, count, index_offset = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != PACK_MAGIC:
+                raise ValueError(f"{path} is not a scenario pack")
+            if version != PACK_VERSION:
+                raise ValueError(f"Unsupported scenario pack version {version} (expected {PACK_VERSION})")
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.index = np.frombuffer(self._data, dtype=_INDEX_DTYPE, count=count, offset=index_offset)
+        self._read = lru_cache(maxsize=64)(self._read_entry)
+        self.meta = self._read("__meta__")
+
+    def _read_entry(self, key: str) -> Optional[Dict]:
+        encoded = key.encode("utf-8")
+        i = int(np.searchsorted(self.index["key"], encoded))
+        if i >= len(self.index) or self.index["key"][i] != encoded:
+            return None
+
+        offset, length = int(self.index["offset"][i]), int(self.index["length"][i])
+        return json.loads(zlib.decompress(self._data[offset:offset + length]))
+
+    def scenario(self, asteroid_name: str, impact_lat: float, impact_lng: float) -> Optional[Dict]:
+        """Scenariusz z paczki albo None, jeśli nie został prekomputowany"""
+        return self._read(scenario_key(asteroid_name, impact_lat, impact_lng))
+
+    def decide(self, scenario: Dict, time_to_impact_min: int, user_lat: float, user_lng: float) -> Optional[Dict]:
+        """
+        Decyzja ewakuacyjna z tablicy scenariusza (None poza tablicą / w komórce granicznej).
+        Używana jest tablica najbliższego kroku czasu <= time_to_impact_min - mniej czasu
+        i większa fala niż w rzeczywistości, więc decyzja jest zachowawcza.
+        """
+        steps = [int(step) for step in scenario["evacuation"] if int(step) <= time_to_impact_min]
+        if not steps:
+            return None
+
+        table = scenario["evacuation"][str(max(steps))]
+
+        geohash = geohash_encode(user_lat, user_lng, table["precision"])
+        decision = table["tiles"].get(geohash)
+        if decision is None:
+            return None
+        return {**decision, "route": [[user_lat, user_lng]] + decision["route"]}
+
+if __name__ == "__main__":
+    # python -m modules.scenario_pack <plik wyjściowy> [lat,lng ...]
+    output = sys.argv[1] if len(sys.argv) > 1 else "data/scenario_pack.izp"
+    sites = [tuple(float(v) for v in arg.split(",")) for arg in sys.argv[2:]] or [(52.2550, 21.0400)]
+
+    shelters = pd.read_csv("data/shelters.csv")
+    count = export_scenario_pack(output, AsteroidDatabase(), sites, shelters, region="Warszawa")
+    print(f"✅ {count} scenarios saved to: {output}")
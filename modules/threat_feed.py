@@ -0,0 +1,182 @@
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import sys
+import threading
+from dataclasses import asdict, fields
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional, Tuple
+
+import aiohttp
+
+from .zagrozenie import Asteroid, AsteroidDatabase
+
+_ASTEROID_FIELDS = [f.name for f in fields(Asteroid)]
+
+def parse_feed(payload) -> List[Asteroid]:
+    """
+    Zamienia dane z feedu na obiekty Asteroid.
+    Akceptuje listę rekordów albo format z AsteroidDatabase.to_json() ({"asteroids": [...]}).
+    Nadmiarowe pola (np. risk_score) są pomijane.
+    """
+    records = payload.get("asteroids", []) if isinstance(payload, dict) else payload
+    return [Asteroid(**{name: record[name] for name in _ASTEROID_FIELDS}) for record in records]
+
+class DirectoryFeed:
+    """
+    Feed z lokalnego katalogu plików *.json (też lokalny zamiennik feedu HTTP).
+    Walidatorem jest lista plików z czasami modyfikacji - odpowiednik ETag.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _snapshot(self) -> str:
+        files = sorted(glob.glob(os.path.join(self.path, "*.json")))
+        return json.dumps([(f, os.path.getmtime(f)) for f in files])
+
+    def _read(self) -> List[Asteroid]:
+        records = []
+        for filepath in sorted(glob.glob(os.path.join(self.path, "*.json"))):
+            with open(filepath, encoding="utf-8") as f:
+                records.extend(parse_feed(json.load(f)))
+        return records
+
+    async def fetch(self, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Tuple[Optional[List[Asteroid]], Optional[str], Optional[str]]:
+        """Zwraca (rekordy lub None gdy bez zmian, nowy etag, nowy last_modified)"""
+        snapshot = await asyncio.to_thread(self._snapshot)
+        if snapshot == etag:
+            return None, etag, last_modified
+
+        records = await asyncio.to_thread(self._read)
+        return records, snapshot, formatdate(usegmt=True)
+
+def serve_directory_feed(path: str, port: int = 8765) -> ThreadingHTTPServer:
+    """
+    Lokalny zamiennik endpointu feedu HTTP: serwuje rekordy z katalogu *.json
+    (jak DirectoryFeed) z nagłówkami ETag / Last-Modified i odpowiada 304
+    na If-None-Match - do sprawdzania HttpFeed bez zewnętrznego serwera.
+    Serwer trzeba uruchomić (serve_forever), np. w wątku.
+    """
+    feed = DirectoryFeed(path)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            snapshot = feed._snapshot()
+            etag = '"' + hashlib.sha1(snapshot.encode("utf-8")).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+            mtimes = [mtime for _, mtime in json.loads(snapshot)]
+            body = json.dumps({"asteroids": [asdict(a) for a in feed._read()]}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", formatdate(max(mtimes, default=0), usegmt=True))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer(("127.0.0.1", port), Handler)
+
+class HttpFeed:
+    """Feed HTTP z warunkowym pobieraniem (If-None-Match / If-Modified-Since)"""
+
+    def __init__(self, url: str, timeout_s: float = 10.0):
+        self.url = url
+        self.timeout = aiohttp.ClientTimeout(total=timeout_s)
+
+    async def fetch(self, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Tuple[Optional[List[Asteroid]], Optional[str], Optional[str]]:
+        """Zwraca (rekordy lub None dla 304, nowy etag, nowy last_modified)"""
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with session.get(self.url, headers=headers) as response:
+                if response.status == 304:
+                    return None, etag, last_modified
+                response.raise_for_status()
+                payload = await response.json(content_type=None)
+                return (
+                    parse_feed(payload),
+                    response.headers.get("ETag", etag),
+                    response.headers.get("Last-Modified", last_modified)
+                )
+
+class ThreatFeedWatcher:
+    """
+    Asynchroniczny obserwator feedu zagrożeń.
+
+    Cyklicznie odpytuje feed (warunkowo - bez zmian nic nie jest pobierane ani liczone),
+    scala nowe rekordy z AsteroidDatabase (metryki liczone tylko dla zmienionych obiektów)
+    i powiadamia subskrybentów listą zmienionych nazw, żeby mogli unieważnić swoje cache.
+    """
+
+    def __init__(self, db: AsteroidDatabase, feed, interval_s: float = 60.0):
+        self.db = db
+        self.feed = feed
+        self.interval_s = interval_s
+        self.etag = None
+        self.last_modified = None
+        self.last_error = None
+        self._subscribers: List[Callable[[List[str]], None]] = []
+        self._stopped = threading.Event()
+
+    def subscribe(self, callback: Callable[[List[str]], None]):
+        """Rejestruje funkcję wywoływaną z listą nazw zmienionych asteroid"""
+        self._subscribers.append(callback)
+
+    async def poll_once(self) -> List[str]:
+        """Jedno odpytanie feedu; zwraca nazwy zmienionych asteroid"""
+        records, self.etag, self.last_modified = await self.feed.fetch(self.etag, self.last_modified)
+        if records is None:
+            return []
+
+        changed = self.db.upsert_asteroids(records)
+        if changed:
+            for callback in self._subscribers:
+                try:
+                    callback(changed)
+                except Exception as e:
+                    print("Błąd subskrybenta feedu:", e)
+        return changed
+
+    async def run(self):
+        """Pętla odpytująca feed do czasu wywołania stop()"""
+        while not self._stopped.is_set():
+            try:
+                await self.poll_once()
+                self.last_error = None
+            except Exception as e:
+                # Błąd feedu nie może zatrzymać obserwatora - próbujemy w kolejnym cyklu
+                self.last_error = e
+                print("Błąd feedu zagrożeń:", e)
+            await asyncio.sleep(self.interval_s)
+
+    def start_in_thread(self):
+        """Uruchamia run() we własnej pętli asyncio w wątku w tle (np. pod Streamlit)"""
+        thread = threading.Thread(target=asyncio.run, args=(self.run(),), daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stopped.set()
+
+if __name__ == "__main__":
+    # python -m modules.threat_feed <katalog z *.json> [port]
+    directory = sys.argv[1] if len(sys.argv) > 1 else "data/feed"
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+    print(f"✅ Serving threat feed from {directory} at http://127.0.0.1:{port}/")
+    serve_directory_feed(directory, port).serve_forever()
@@ -5,6 +5,18 @@ from dotenv import load_dotenv
 # Ładowanie zmiennych środowiskowych
 load_dotenv()
 ORS_API_KEY = os.getenv("ORS_API_KEY")
+# Limity wywołań ORS przy prekomputacji tablic decyzji (modules/route_cache.py)
+ORS_MAX_CONCURRENT = int(os.getenv("ORS_MAX_CONCURRENT", "2"))
+ORS_MIN_INTERVAL_S = float(os.getenv("ORS_MIN_INTERVAL_S", "0"))
+# Źródło aktualizacji zagrożeń: endpoint HTTP albo lokalny katalog z plikami JSON
+THREAT_FEED_URL = os.getenv("THREAT_FEED_URL")
+THREAT_FEED_DIR = os.getenv("THREAT_FEED_DIR")
+# Prekomputowana paczka scenariuszy do pracy bez sieci (modules/scenario_pack.py)
+SCENARIO_PACK = os.getenv("SCENARIO_PACK", "data/scenario_pack.izp")
+# Katalog z POI podzielonymi na kafle (modules/poi_tiles.py); bez niego czytane są pliki CSV
+POI_TILES_DIR = os.getenv("POI_TILES_DIR", "data/tiles")
+# Elementy orbit (modules/orbit_propagation.py) do przeliczania dat i odległości zbliżeń
+ORBITS_FILE = os.getenv("ORBITS_FILE", "data/orbits.json")
 
 # Tworzymy klienta ORS raz
 client = openrouteservice.Client(key=ORS_API_KEY)
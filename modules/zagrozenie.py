@@ -1,11 +1,13 @@
 import math
 import json
+import threading
 import requests
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, replace
 from typing import List, Dict, Tuple, Optional
 from enum import Enum
 import pandas as pd
 from datetime import datetime
+from .orbit_propagation import OrbitalElements, date_to_jd, find_close_approaches, jd_to_date
 
 class ThreatLevel(Enum):
     """Poziomy zagrożenia asteroidą"""
@@ -45,6 +47,20 @@ class Asteroid:
         else:
             return "steep (shorter surface range)"
 
+SHOCKWAVE_DURATION_MIN = 300  # Czas, po którym fala osiąga maksymalny zasięg
+
+def calculate_shockwave_radius(max_radius_km: float,
+                               time_to_impact_min: float,
+                               time_after_impact_min: float = 0) -> float:
+    """
+    Aktualny promień fali uderzeniowej dla danego momentu symulacji
+    (fala rośnie liniowo do max_radius_km w ciągu SHOCKWAVE_DURATION_MIN minut)
+    """
+    shockwave_speed = max_radius_km / SHOCKWAVE_DURATION_MIN
+    if time_to_impact_min > 0:
+        return min(max_radius_km, shockwave_speed * (60 - time_to_impact_min))
+    return min(max_radius_km, shockwave_speed * time_after_impact_min)
+
 class ImpactZone:
     """
     Klasa do obliczania okręgów uderzenia i fali uderzeniowej
@@ -217,6 +233,11 @@ class AsteroidDatabase: # WAZNA KLASA- aktualnie jest 6 asteroid
 
     def __init__(self):
         self.asteroids: List[Asteroid] = []
+        self._metrics: Dict[str, Dict] = {}  # Cache metryk ThreatAnalyzer (po nazwie)
+        # Zbliżenia z propagacji orbit (nazwa -> pola Asteroid) - mają pierwszeństwo przed danymi z feedu
+        self._close_approaches: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self.revision = 0  # Rośnie przy każdej zmianie danych - do unieważniania wyników zależnych
         self._initialize_known_threats()
 
     def _initialize_known_threats(self):
@@ -288,6 +309,96 @@ class AsteroidDatabase: # WAZNA KLASA- aktualnie jest 6 asteroid
     def add_asteroid(self, asteroid: Asteroid):
         """Dodaje nową asteroidę do bazy"""
         self.asteroids.append(asteroid)
+        self._metrics.pop(asteroid.name, None)
+        self.revision += 1
+
+    def get_threat_metrics(self, asteroid: Asteroid) -> Dict:
+        """
+        Zwraca metryki ThreatAnalyzer dla asteroidy (liczone raz, potem z cache).
+        Cache jest unieważniany przez add_asteroid / upsert_asteroids.
+        """
+        metrics = self._metrics.get(asteroid.name)
+        if metrics is None:
+            energy = asteroid.calculate_kinetic_energy()
+            metrics = {
+                "energy_megatons": energy,
+                "threat_level": ThreatAnalyzer.categorize_threat(asteroid),
+                "risk_score": ThreatAnalyzer.calculate_risk_score(asteroid),
+                "historical_comparison": ThreatAnalyzer.compare_to_historical_events(energy)
+            }
+            self._metrics[asteroid.name] = metrics
+        return metrics
+
+    def upsert_asteroids(self, records: List[Asteroid]) -> List[str]:
+        """
+        Scala rekordy z zewnętrznego źródła z bazą (klucz: nazwa)
+        Metryki są przeliczane tylko dla nowych lub zmienionych asteroid
+
+        Returns:
+            Lista nazw asteroid, które się zmieniły
+        """
+        changed = []
+        with self._lock:
+            index = {a.name: i for i, a in enumerate(self.asteroids)}
+            for record in records:
+                # Pola zbliżenia policzone z orbity nie pochodzą z feedu - nie są porównywane ani nadpisywane
+                if record.name in self._close_approaches:
+                    record = replace(record, **self._close_approaches[record.name])
+                i = index.get(record.name)
+                if i is None:
+                    index[record.name] = len(self.asteroids)
+                    self.asteroids.append(record)
+                elif self.asteroids[i] != record:
+                    self.asteroids[i] = record
+                else:
+                    continue
+
+                self._metrics.pop(record.name, None)
+                self.get_threat_metrics(record)
+                changed.append(record.name)
+
+            if changed:
+                self.revision += 1
+
+        return changed
+
+    def update_close_approaches(self,
+                                orbits: Dict[str, OrbitalElements],
+                                start_date: str,
+                                end_date: str,
+                                step_days: float = 0.25) -> int:
+        """
+        Przelicza miss_distance_km i close_approach_date z elementów orbit
+        (propagacja dwóch ciał, jeden wsadowy przebieg dla całego katalogu)
+
+        Args:
+            orbits: słownik nazwa asteroidy -> OrbitalElements
+            start_date, end_date: okno wyszukiwania 'YYYY-MM-DD'
+            step_days: krok siatki czasu w dniach
+
+        Returns:
+            Liczba zaktualizowanych asteroid
+        """
+        targets = [a for a in self.asteroids if a.name in orbits]
+        if not targets:
+            return 0
+
+        distances, epochs = find_close_approaches(
+            [orbits[a.name] for a in targets],
+            date_to_jd(start_date),
+            date_to_jd(end_date),
+            step_days
+        )
+
+        with self._lock:
+            for asteroid, distance, epoch in zip(targets, distances, epochs):
+                fields = {"miss_distance_km": round(float(distance), 0), "close_approach_date": jd_to_date(epoch)}
+                self._close_approaches[asteroid.name] = fields
+                for name, value in fields.items():
+                    setattr(asteroid, name, value)
+            self.revision += 1
+
+        return len(targets)
 
     def get_most_dangerous(self, top_n: int = 5) -> List[Asteroid]:
         """
@@ -296,7 +407,7 @@ class AsteroidDatabase: # WAZNA KLASA- aktualnie jest 6 asteroid
         """
         sorted_asteroids = sorted(
             self.asteroids,
-            key=lambda a: ThreatAnalyzer.calculate_risk_score(a),
+            key=lambda a: self.get_threat_metrics(a)["risk_score"],
             reverse=True
         )
         return sorted_asteroids[:top_n]
@@ -304,7 +415,7 @@ class AsteroidDatabase: # WAZNA KLASA- aktualnie jest 6 asteroid
     def filter_by_threat_level(self, level: ThreatLevel) -> List[Asteroid]:
         """Filtruje asteroidy według poziomu zagrożenia"""
         return [a for a in self.asteroids
-                if ThreatAnalyzer.categorize_threat(a) == level]
+                if self.get_threat_metrics(a)["threat_level"] == level]
 
     def to_pandas(self) -> pd.DataFrame:
         """
@@ -313,9 +424,10 @@ class AsteroidDatabase: # WAZNA KLASA- aktualnie jest 6 asteroid
         """
         data = []
         for asteroid in self.asteroids:
-            threat_level = ThreatAnalyzer.categorize_threat(asteroid)
-            energy = asteroid.calculate_kinetic_energy()
-            risk_score = ThreatAnalyzer.calculate_risk_score(asteroid)
+            metrics = self.get_threat_metrics(asteroid)
+            threat_level = metrics["threat_level"]
+            energy = metrics["energy_megatons"]
+            risk_score = metrics["risk_score"]
 
             data.append({
                 "Nazwa": asteroid.name,
@@ -345,10 +457,11 @@ class AsteroidDatabase: # WAZNA KLASA- aktualnie jest 6 asteroid
         }
 
         for asteroid in self.asteroids:
-            threat_level = ThreatAnalyzer.categorize_threat(asteroid)
-            energy = asteroid.calculate_kinetic_energy()
-            risk_score = ThreatAnalyzer.calculate_risk_score(asteroid)
-            comparison = ThreatAnalyzer.compare_to_historical_events(energy)
+            metrics = self.get_threat_metrics(asteroid)
+            threat_level = metrics["threat_level"]
+            energy = metrics["energy_megatons"]
+            risk_score = metrics["risk_score"]
+            comparison = metrics["historical_comparison"]
 
             asteroid_data = {
                 **asdict(asteroid),
@@ -385,17 +498,13 @@ class AsteroidDatabase: # WAZNA KLASA- aktualnie jest 6 asteroid
         impact_zone = ImpactZone(asteroid, lat, lon)
         impact_details = impact_zone.get_impact_details()
 
-        # Dodaj dodatkowe analizy
-        threat_level = ThreatAnalyzer.categorize_threat(asteroid)
-        risk_score = ThreatAnalyzer.calculate_risk_score(asteroid)
-        comparison = ThreatAnalyzer.compare_to_historical_events(
-            impact_zone.energy_megatons
-        )
+        # Dodaj dodatkowe analizy (z cache metryk - nie zależą od miejsca uderzenia)
+        metrics = self.get_threat_metrics(asteroid)
 
         impact_details.update({
-            "threat_level": threat_level.value,
-            "risk_score": risk_score,
-            "historical_comparison": comparison,
+            "threat_level": metrics["threat_level"].value,
+            "risk_score": metrics["risk_score"],
+            "historical_comparison": metrics["historical_comparison"],
             "impact_probability": asteroid.impact_probability,
             "asteroid_info": {
                 "name": asteroid.name,